@@ -1,9 +1,11 @@
+import os
 from datetime import datetime, timedelta
 from typing import Optional
+import dotenv
 from fastapi import Depends, HTTPException, status, Request
 from jose import JWTError, jwt
 from pydantic import BaseModel
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models import User
 from database import get_db
 
@@ -12,6 +14,13 @@ SECRET_KEY = "your-secret-key-here"  # Store this in .env
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+dotenv.load_dotenv()
+
+# Battle tags allowed to run site-wide maintenance such as cache invalidation
+ADMIN_BATTLE_TAGS = {
+    tag.strip() for tag in os.getenv("ADMIN_BATTLE_TAGS", "").split(",") if tag.strip()
+}
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -28,7 +37,7 @@ def create_access_token(data: dict):
 
 async def get_current_user(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Optional[User]:
     token = request.cookies.get("session")
     
@@ -44,7 +53,7 @@ async def get_current_user(
     except JWTError:
         return None
 
-    user = db.get(User, token_data.user_id)
+    user = await db.get(User, token_data.user_id)
     if user is None:
         return None
     
@@ -52,4 +61,7 @@ async def get_current_user(
     if user.token_expires_at and user.token_expires_at < datetime.utcnow():
         return None
     
-    return user
\ No newline at end of file
+    return user
+
+def is_admin(user: Optional[User]) -> bool:
+    return user is not None and user.battle_tag in ADMIN_BATTLE_TAGS
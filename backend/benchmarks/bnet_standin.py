@@ -0,0 +1,449 @@
+"""
+Local stand-in for the Battle.net OAuth, game data and profile APIs.
+
+Serves deterministic generated data for every endpoint core/bliz.py calls,
+with configurable latency, throttling and failures, so the client and the
+guild and roster routes can be load tested without spending real quota.
+Guilds have --members members unless their slug ends in a number, so
+"raiders-5000" has 5,000.
+
+Usage (from backend/):
+    python -m benchmarks.bnet_standin [--port 8100] [--members 1000]
+        [--latency lognormal --latency-ms 80 --latency-sigma 0.5]
+        [--qps 100] [--throttle-rate 0.01 --retry-after 1] [--error-rate 0.01]
+
+Then start the backend with
+    BNET_API_URL=http://localhost:8100 BNET_OAUTH_URL=http://localhost:8100/oauth
+and BLIZZARD_CLIENT_ID/SECRET set to anything.
+
+GET /__stats reports how many requests were served, throttled and failed.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import re
+import time
+from urllib.parse import urlencode
+
+from aiohttp import web
+
+CLASSES = {
+    1: "Warrior", 2: "Paladin", 3: "Hunter", 4: "Rogue", 5: "Priest",
+    6: "Death Knight", 7: "Shaman", 8: "Mage", 9: "Warlock", 10: "Monk",
+    11: "Druid", 12: "Demon Hunter", 13: "Evoker"
+}
+
+RACES = {
+    1: "Human", 2: "Orc", 3: "Dwarf", 4: "Night Elf", 5: "Undead", 6: "Tauren",
+    7: "Gnome", 8: "Troll", 9: "Goblin", 10: "Blood Elf", 11: "Draenei",
+    22: "Worgen", 24: "Pandaren", 27: "Nightborne", 28: "Highmountain Tauren",
+    29: "Void Elf", 30: "Lightforged Draenei", 31: "Zandalari Troll",
+    32: "Kul Tiran", 34: "Dark Iron Dwarf", 35: "Vulpera", 36: "Mag'har Orc",
+    37: "Mechagnome", 52: "Dracthyr", 84: "Earthen"
+}
+
+SPECS = {class_id: [class_id * 10 + i for i in range(3)] for class_id in CLASSES}
+
+SLOTS = [
+    "HEAD", "NECK", "SHOULDER", "BACK", "CHEST", "SHIRT", "TABARD", "WRIST",
+    "HANDS", "WAIST", "LEGS", "FEET", "FINGER_1", "FINGER_2", "TRINKET_1",
+    "TRINKET_2", "MAIN_HAND", "OFF_HAND"
+]
+
+REALM_COUNT = 250
+SYLLABLES = ["kel", "thu", "zad", "ar", "gent", "dawn", "ill", "idan", "sar", "gor", "mal", "fur", "ion", "stor", "rage"]
+
+
+def seeded(*parts) -> random.Random:
+    """Random generator that gives the same data for the same request every time"""
+    digest = hashlib.sha256(":".join(str(part).lower() for part in parts).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def realm_name(realm_id: int) -> str:
+    rng = seeded("realm", realm_id)
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize() + f" {realm_id}"
+
+
+def realm_slug(realm_id: int) -> str:
+    return realm_name(realm_id).lower().replace(" ", "-")
+
+
+def realm_id_for(slug: str) -> int:
+    match = re.search(r"(\d+)$", slug)
+    if match and 1 <= int(match.group(1)) <= REALM_COUNT:
+        return int(match.group(1))
+    return seeded("realm-slug", slug).randint(1, REALM_COUNT)
+
+
+class StandIn:
+    def __init__(self, args):
+        self.args = args
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "unauthorized": 0}
+        self._tokens = float(args.qps or 0)
+        self._refilled_at = time.monotonic()
+
+    def base(self, request: web.Request) -> str:
+        return f"{request.scheme}://{request.host}"
+
+    def link(self, request, path, namespace):
+        return {"href": f"{self.base(request)}{path}?namespace={namespace}"}
+
+    def namespace(self, request, kind):
+        return request.query.get("namespace") or f"{kind}-us"
+
+    # Fault injection
+
+    def latency(self) -> float:
+        mode, ms, sigma = self.args.latency, self.args.latency_ms, self.args.latency_sigma
+        if mode == "fixed":
+            return ms / 1000
+        if mode == "uniform":
+            return random.uniform(0, 2 * ms) / 1000
+        return random.lognormvariate(0, sigma) * ms / 1000
+
+    def take_token(self) -> bool:
+        if not self.args.qps:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.args.qps, self._tokens + (now - self._refilled_at) * self.args.qps)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    @web.middleware
+    async def faults(self, request, handler):
+        if request.path == "/__stats":
+            return await handler(request)
+        self.stats["requests"] += 1
+        await asyncio.sleep(self.latency())
+
+        if not self.take_token() or random.random() < self.args.throttle_rate:
+            self.stats["throttled"] += 1
+            return web.json_response(
+                {"code": 429, "type": "BLZWEBAPI00000429", "detail": "Too Many Requests"},
+                status=429,
+                headers={"Retry-After": str(self.args.retry_after)}
+            )
+        if random.random() < self.args.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({"code": 503, "detail": "Service Unavailable"}, status=503)
+
+        if not request.path.startswith("/oauth/") or request.path == "/oauth/userinfo":
+            if not request.headers.get("Authorization", "").startswith("Bearer "):
+                self.stats["unauthorized"] += 1
+                return web.json_response({"code": 401, "detail": "Unauthorized"}, status=401)
+
+        response = await handler(request)
+        self.stats["ok"] += 1
+        return response
+
+    # OAuth
+
+    async def authorize(self, request):
+        query = urlencode({"code": os.urandom(8).hex(), "state": request.query.get("state", "")})
+        raise web.HTTPFound(f"{request.query['redirect_uri']}?{query}")
+
+    async def token(self, request):
+        return web.json_response({
+            "access_token": os.urandom(16).hex(),
+            "token_type": "bearer",
+            "expires_in": 86399,
+            "scope": "wow.profile"
+        })
+
+    async def userinfo(self, request):
+        rng = seeded("user", request.headers["Authorization"])
+        account_id = rng.randint(10_000_000, 99_999_999)
+        return web.json_response({"id": account_id, "sub": str(account_id), "battletag": f"Player#{account_id % 10000:04d}"})
+
+    # Game data
+
+    async def realm_index(self, request):
+        namespace = self.namespace(request, "dynamic")
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, namespace)},
+            "realms": [
+                {
+                    "key": self.link(request, f"/data/wow/realm/{realm_id}", namespace),
+                    "name": realm_name(realm_id),
+                    "id": realm_id,
+                    "slug": realm_slug(realm_id)
+                }
+                for realm_id in range(1, REALM_COUNT + 1)
+            ]
+        })
+
+    async def race_index(self, request):
+        namespace = self.namespace(request, "static")
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, namespace)},
+            "races": [
+                {"key": self.link(request, f"/data/wow/playable-race/{race_id}", namespace), "name": name, "id": race_id}
+                for race_id, name in RACES.items()
+            ]
+        })
+
+    async def class_index(self, request):
+        namespace = self.namespace(request, "static")
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, namespace)},
+            "classes": [
+                {"key": self.link(request, f"/data/wow/playable-class/{class_id}", namespace), "name": name, "id": class_id}
+                for class_id, name in CLASSES.items()
+            ]
+        })
+
+    async def media(self, request):
+        kind, media_id = request.match_info["kind"], int(request.match_info["id"])
+        if kind == "playable-class" and media_id not in CLASSES:
+            raise web.HTTPNotFound()
+        namespace = self.namespace(request, "static")
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, namespace)},
+            "assets": [{
+                "key": "icon",
+                "value": f"https://render.worldofwarcraft.com/us/icons/56/{kind}_{media_id}.jpg",
+                "file_data_id": media_id
+            }],
+            "id": media_id
+        })
+
+    # Guilds
+
+    def member_count(self, guild_slug):
+        match = re.search(r"-(\d+)$", guild_slug)
+        return int(match.group(1)) if match else self.args.members
+
+    def guild_doc(self, request, realm, guild):
+        rng = seeded("guild", realm, guild)
+        realm_id = realm_id_for(realm)
+        namespace = self.namespace(request, "profile")
+        return {
+            "_links": {"self": self.link(request, f"/data/wow/guild/{realm}/{guild}", namespace)},
+            "id": rng.randint(1_000_000, 99_999_999),
+            "name": guild.replace("-", " ").title(),
+            "faction": {"type": rng.choice(["ALLIANCE", "HORDE"]), "name": "Faction"},
+            "achievement_points": rng.randint(1000, 40000),
+            "member_count": self.member_count(guild),
+            "realm": {
+                "key": self.link(request, f"/data/wow/realm/{realm_id}", "dynamic-us"),
+                "name": realm_name(realm_id),
+                "id": realm_id,
+                "slug": realm
+            },
+            "crest": {"emblem": {"id": rng.randint(1, 200)}, "border": {"id": rng.randint(1, 5)}},
+            "created_timestamp": rng.randint(1_100_000_000_000, 1_700_000_000_000)
+        }
+
+    async def guild(self, request):
+        return web.json_response(self.guild_doc(request, request.match_info["realm"], request.match_info["guild"]))
+
+    async def roster(self, request):
+        realm, guild = request.match_info["realm"], request.match_info["guild"]
+        guild_doc = self.guild_doc(request, realm, guild)
+        rng = seeded("roster", realm, guild)
+        namespace = self.namespace(request, "profile")
+        members = []
+        for i in range(self.member_count(guild)):
+            member_realm = realm_id_for(realm) if rng.random() < 0.9 else rng.randint(1, REALM_COUNT)
+            name = f"Member{guild_doc['id'] % 1000}x{i}"
+            members.append({
+                "character": {
+                    "key": self.link(request, f"/profile/wow/character/{realm_slug(member_realm)}/{name.lower()}", namespace),
+                    "name": name,
+                    "id": guild_doc["id"] * 10_000 + i,
+                    "realm": {
+                        "key": self.link(request, f"/data/wow/realm/{member_realm}", "dynamic-us"),
+                        "id": member_realm,
+                        "slug": realm_slug(member_realm)
+                    },
+                    "level": rng.choice([70, 80, 80, 80]),
+                    "playable_class": {"key": self.link(request, "/data/wow/playable-class/1", "static-us"), "id": rng.choice(list(CLASSES))},
+                    "playable_race": {"key": self.link(request, "/data/wow/playable-race/1", "static-us"), "id": rng.choice(list(RACES))},
+                    "faction": {"type": guild_doc["faction"]["type"]}
+                },
+                "rank": 0 if i == 0 else rng.randint(1, 9)
+            })
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, namespace)},
+            "guild": {k: guild_doc[k] for k in ("id", "name", "faction", "realm")},
+            "members": members
+        })
+
+    # Characters
+
+    def character_doc(self, request, realm, name):
+        rng = seeded("character", realm, name)
+        realm_id = realm_id_for(realm)
+        class_id = rng.choice(list(CLASSES))
+        race_id = rng.choice(list(RACES))
+        return {
+            "_links": {"self": self.link(request, f"/profile/wow/character/{realm}/{name}", "profile-us")},
+            "id": rng.randint(100_000_000, 999_999_999),
+            "name": name.capitalize(),
+            "gender": {"type": rng.choice(["MALE", "FEMALE"]), "name": "Gender"},
+            "faction": {"type": rng.choice(["ALLIANCE", "HORDE"]), "name": "Faction"},
+            "race": {"key": self.link(request, f"/data/wow/playable-race/{race_id}", "static-us"), "name": RACES[race_id], "id": race_id},
+            "character_class": {"key": self.link(request, f"/data/wow/playable-class/{class_id}", "static-us"), "name": CLASSES[class_id], "id": class_id},
+            "active_spec": {"id": rng.choice(SPECS[class_id])},
+            "realm": {"key": self.link(request, f"/data/wow/realm/{realm_id}", "dynamic-us"), "name": realm_name(realm_id), "id": realm_id, "slug": realm},
+            "level": 80,
+            "experience": 0,
+            "achievement_points": rng.randint(1000, 40000),
+            "average_item_level": rng.randint(580, 640),
+            "equipped_item_level": rng.randint(580, 640),
+            "last_login_timestamp": int(time.time() * 1000) - rng.randint(0, 10**9)
+        }
+
+    async def character(self, request):
+        return web.json_response(self.character_doc(request, request.match_info["realm"], request.match_info["name"]))
+
+    async def equipment(self, request):
+        realm, name = request.match_info["realm"], request.match_info["name"]
+        rng = seeded("equipment", realm, name)
+        items = []
+        for slot in SLOTS:
+            item_id = rng.randint(200_000, 230_000)
+            items.append({
+                "item": {"key": self.link(request, f"/data/wow/item/{item_id}", "static-us"), "id": item_id},
+                "slot": {"type": slot, "name": slot.replace("_", " ").title()},
+                "quantity": 1,
+                "context": 6,
+                "bonus_list": [rng.randint(1000, 12000) for _ in range(rng.randint(2, 6))],
+                "quality": {"type": "EPIC", "name": "Epic"},
+                "name": f"Generated {slot.title()} {item_id}",
+                "media": {"key": self.link(request, f"/data/wow/media/item/{item_id}", "static-us"), "id": item_id},
+                "item_class": {"name": "Armor", "id": 4},
+                "item_subclass": {"name": "Plate", "id": 4},
+                "inventory_type": {"type": slot, "name": slot.title()},
+                "binding": {"type": "ON_ACQUIRE", "name": "Binds when picked up"},
+                "armor": {"value": rng.randint(100, 2000), "display": {"display_string": "Armor"}},
+                "stats": [
+                    {"type": {"type": stat, "name": stat.title()}, "value": rng.randint(100, 900), "display": {"display_string": f"+{stat.title()}"}}
+                    for stat in ("STAMINA", "STRENGTH", "CRIT_RATING", "HASTE_RATING")
+                ],
+                "level": {"value": rng.randint(580, 640), "display_string": "Item Level"},
+                "sockets": [{"socket_type": {"type": "PRISMATIC"}}] if rng.random() < 0.2 else [],
+                "enchantments": [{"enchantment_id": rng.randint(6000, 7500), "display_string": "Enchanted"}] if rng.random() < 0.5 else []
+            })
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, "profile-us")},
+            "character": {"name": name.capitalize(), "realm": {"slug": realm}},
+            "equipped_items": items
+        })
+
+    async def character_media(self, request):
+        realm, name = request.match_info["realm"], request.match_info["name"]
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, "profile-us")},
+            "assets": [
+                {"key": key, "value": f"https://render.worldofwarcraft.com/us/character/{realm}/{name}-{key}.jpg"}
+                for key in ("avatar", "inset", "main-raw")
+            ]
+        })
+
+    async def mythic_keystone(self, request):
+        rng = seeded("keystone", request.match_info["realm"], request.match_info["name"])
+        rating = round(rng.uniform(0, 3500), 1)
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, "profile-us")},
+            "current_period": {"period": {"id": 1000}},
+            "current_mythic_rating": {"color": {"r": 255, "g": 128, "b": 0, "a": 1.0}, "rating": rating}
+        })
+
+    async def raids(self, request):
+        rng = seeded("raids", request.match_info["realm"], request.match_info["name"])
+        total = 8
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, "profile-us")},
+            "expansions": [{
+                "expansion": {"name": "The War Within", "id": 514},
+                "instances": [
+                    {
+                        "instance": {"name": f"Raid {raid}", "id": 1200 + raid},
+                        "modes": [
+                            {
+                                "difficulty": {"type": difficulty, "name": difficulty.title()},
+                                "status": {"type": "IN_PROGRESS", "name": "In Progress"},
+                                "progress": {"completed_count": rng.randint(0, total), "total_count": total}
+                            }
+                            for difficulty in ("NORMAL", "HEROIC", "MYTHIC")
+                        ]
+                    }
+                    for raid in range(1, 4)
+                ]
+            }]
+        })
+
+    async def wow_profile(self, request):
+        rng = seeded("account", request.headers["Authorization"])
+        characters = []
+        for i in range(rng.randint(3, 12)):
+            realm_id = rng.randint(1, REALM_COUNT)
+            characters.append({
+                "character": self.link(request, f"/profile/wow/character/{realm_slug(realm_id)}/alt{i}", "profile-us"),
+                "protected_character": self.link(request, f"/profile/user/wow/protected-character/{realm_id}-{i}", "profile-us"),
+                "name": f"Alt{rng.randint(1000, 9999)}x{i}",
+                "id": rng.randint(100_000_000, 999_999_999),
+                "realm": {"key": self.link(request, f"/data/wow/realm/{realm_id}", "dynamic-us"), "name": realm_name(realm_id), "id": realm_id, "slug": realm_slug(realm_id)},
+                "playable_class": {"key": self.link(request, "/data/wow/playable-class/1", "static-us"), "id": rng.choice(list(CLASSES))},
+                "playable_race": {"key": self.link(request, "/data/wow/playable-race/1", "static-us"), "id": rng.choice(list(RACES))},
+                "gender": {"type": rng.choice(["MALE", "FEMALE"])},
+                "faction": {"type": rng.choice(["ALLIANCE", "HORDE"])},
+                "level": rng.choice([10, 60, 70, 80])
+            })
+        return web.json_response({
+            "_links": {"self": self.link(request, request.path, "profile-us")},
+            "id": rng.randint(10_000_000, 99_999_999),
+            "wow_accounts": [{"id": rng.randint(100_000, 999_999), "characters": characters}]
+        })
+
+    async def stats_handler(self, request):
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults])
+        app.add_routes([
+            web.get("/__stats", self.stats_handler),
+            web.get("/oauth/authorize", self.authorize),
+            web.post("/oauth/token", self.token),
+            web.get("/oauth/userinfo", self.userinfo),
+            web.get("/data/wow/realm/index", self.realm_index),
+            web.get("/data/wow/playable-race/index", self.race_index),
+            web.get("/data/wow/playable-class/index", self.class_index),
+            web.get("/data/wow/media/{kind}/{id:\\d+}", self.media),
+            web.get("/data/wow/guild/{realm}/{guild}", self.guild),
+            web.get("/data/wow/guild/{realm}/{guild}/roster", self.roster),
+            web.get("/profile/user/wow", self.wow_profile),
+            web.get("/profile/wow/character/{realm}/{name}", self.character),
+            web.get("/profile/wow/character/{realm}/{name}/equipment", self.equipment),
+            web.get("/profile/wow/character/{realm}/{name}/character-media", self.character_media),
+            web.get("/profile/wow/character/{realm}/{name}/mythic-keystone-profile", self.mythic_keystone),
+            web.get("/profile/wow/character/{realm}/{name}/encounters/raids", self.raids),
+        ])
+        return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--members", type=int, default=1000, help="members per generated guild")
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=50, help="fixed/median latency; uniform spans 0..2x")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="spread of the lognormal distribution")
+    parser.add_argument("--qps", type=float, default=100, help="requests per second before 429s, 0 for unlimited")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests randomly answered 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    web.run_app(StandIn(args).app(), host=args.host, port=args.port)
@@ -0,0 +1,122 @@
+"""
+Bytes stored and encode/decode time for each cache entry format.
+
+Compares the legacy ``{"data": ..., "timestamp": isoformat}`` JSON entries
+with every codec and compressor installed here, using payloads shaped like
+the Battle.net responses the cache holds most of. Redis is not needed.
+
+Usage (from backend/):
+    python -m benchmarks.cache_codec [--iterations 200] [--members 1000]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime
+
+from core.codec import EntryCodec, available_codecs, available_compressors
+
+
+def realm_index(realms):
+    return {
+        "_links": {"self": {"href": "https://us.api.blizzard.com/data/wow/realm/index?namespace=dynamic-us"}},
+        "realms": [
+            {
+                "key": {"href": f"https://us.api.blizzard.com/data/wow/realm/{i}?namespace=dynamic-us"},
+                "name": f"Realm {i}",
+                "id": i,
+                "slug": f"realm-{i}"
+            }
+            for i in range(realms)
+        ]
+    }
+
+
+def guild_roster(members):
+    return {
+        "_links": {"self": {"href": "https://us.api.blizzard.com/data/wow/guild/realm/guild/roster?namespace=profile-us"}},
+        "guild": {"name": "Guild", "id": 1, "realm": {"name": "Realm", "id": 1, "slug": "realm"}},
+        "members": [
+            {
+                "character": {
+                    "key": {"href": f"https://us.api.blizzard.com/profile/wow/character/realm/member{i}?namespace=profile-us"},
+                    "name": f"Member{i}",
+                    "id": 100000 + i,
+                    "realm": {"key": {"href": "https://us.api.blizzard.com/data/wow/realm/1?namespace=dynamic-us"}, "id": 1, "slug": "realm"},
+                    "level": random.choice([70, 80]),
+                    "playable_class": {"key": {"href": "https://us.api.blizzard.com/data/wow/playable-class/1?namespace=static-us"}, "id": random.randint(1, 13)},
+                    "playable_race": {"key": {"href": "https://us.api.blizzard.com/data/wow/playable-race/1?namespace=static-us"}, "id": random.randint(1, 37)},
+                    "faction": {"type": "ALLIANCE"}
+                },
+                "rank": random.randint(0, 9)
+            }
+            for i in range(members)
+        ]
+    }
+
+
+def class_media():
+    return {
+        "_links": {"self": {"href": "https://us.api.blizzard.com/data/wow/media/playable-class/1?namespace=static-us"}},
+        "assets": [{"key": "icon", "value": "https://render.worldofwarcraft.com/us/icons/56/classicon_warrior.jpg"}],
+        "id": 1
+    }
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(samples)
+
+
+def legacy_format(data, iterations):
+    def encode():
+        return json.dumps({'data': data, 'timestamp': datetime.now().isoformat()})
+
+    def decode():
+        entry = json.loads(raw)
+        datetime.fromisoformat(entry['timestamp'])
+        return entry['data']
+
+    raw = encode()
+    return len(raw.encode()), timed(encode, iterations), timed(decode, iterations)
+
+
+def packed_format(entry_codec, data, iterations):
+    raw, _ = entry_codec.encode(data)
+    return len(raw), timed(lambda: entry_codec.encode(data), iterations), timed(lambda: entry_codec.decode(raw), iterations)
+
+
+def main(iterations, members):
+    payloads = {
+        "realm index (300 realms)": realm_index(300),
+        f"guild roster ({members} members)": guild_roster(members),
+        "class media": class_media()
+    }
+    codecs = available_codecs()
+    compressors = available_compressors()
+    print(f"codecs: {', '.join(codecs)}; compressors: {', '.join(compressors)}\n")
+
+    for label, data in payloads.items():
+        print(label)
+        print(f"  {'format':<20}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+        size, encode_us, decode_us = legacy_format(data, iterations)
+        print(f"  {'legacy json':<20}{size:>10,}{encode_us:>12.1f}{decode_us:>12.1f}")
+        for codec in codecs.values():
+            for compressor in compressors.values():
+                size, encode_us, decode_us = packed_format(EntryCodec(codec, compressor), data, iterations)
+                name = f"{codec.name}+{compressor.name}"
+                print(f"  {name:<20}{size:>10,}{encode_us:>12.1f}{decode_us:>12.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--members", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.iterations, args.members)
@@ -0,0 +1,100 @@
+"""
+Event-loop latency under concurrent cache traffic.
+
+Runs the same burst of cache lookups through a blocking Redis client (the old
+cache layer) and through the pooled asyncio client in core.cache, while a
+heartbeat task measures how late the event loop wakes it up.
+
+Usage (from backend/, with Redis running at REDIS_URL):
+    python -m benchmarks.cache_loop_latency [--requests 2000] [--concurrency 100]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime
+
+import redis
+
+from core.cache import REDIS_URL, redis_client, close_redis
+
+HEARTBEAT_INTERVAL = 0.001
+KEY_COUNT = 50
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+
+async def heartbeat(lags, stop):
+    """Record how far past its deadline each 1ms sleep wakes up"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append((loop.time() - expected) * 1000)
+
+
+async def run_burst(lookup, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await lookup(f"bench:cache:{i % KEY_COUNT}")
+
+    lags = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    return elapsed, lags
+
+
+def report(label, requests, elapsed, lags):
+    print(f"{label}")
+    print(f"  throughput: {requests / elapsed:,.0f} lookups/s")
+    if lags:
+        print(f"  loop lag p50: {statistics.median(lags):.2f} ms")
+        print(f"  loop lag p99: {percentile(lags, 99):.2f} ms")
+        print(f"  loop lag max: {max(lags):.2f} ms")
+    else:
+        print("  loop lag: heartbeat never ran (loop fully blocked)")
+
+
+async def main(requests, concurrency):
+    payload = json.dumps({
+        'data': {'realms': [{'id': i, 'name': f'Realm {i}'} for i in range(300)]},
+        'timestamp': datetime.now().isoformat()
+    })
+    sync_client = redis.from_url(REDIS_URL, decode_responses=True)
+    for i in range(KEY_COUNT):
+        sync_client.set(f"bench:cache:{i}", payload)
+
+    async def blocking_lookup(key):
+        json.loads(sync_client.get(key))
+
+    async def async_lookup(key):
+        json.loads(await redis_client.get(key))
+
+    elapsed, lags = await run_burst(blocking_lookup, requests, concurrency)
+    report("before: synchronous redis client", requests, elapsed, lags)
+
+    elapsed, lags = await run_burst(async_lookup, requests, concurrency)
+    report("after: pooled asyncio redis client", requests, elapsed, lags)
+
+    sync_client.delete(*[f"bench:cache:{i}" for i in range(KEY_COUNT)])
+    await close_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,218 @@
+"""
+Database concurrency: blocking Session versus AsyncSession under mixed traffic.
+
+Sends requests at a fixed average rate against a scratch SQLite database,
+most of them reading rosters the way /guild/{realm}/{guild}/rosters does
+and the rest syncing a guild roster the way /guild/{realm}/{guild} does,
+while a ticker standing in for a WebSocket simulation stream wakes every
+10 ms. Latency is measured from each request's scheduled arrival, so time
+spent queued behind a blocked event loop counts. Reports percentiles per
+request type and how late the ticker ran, once with the synchronous Session
+the routes used to open and once with the AsyncSession from
+database.get_db. Requests that fail on SQLite lock errors are counted
+rather than timed.
+
+Usage (from backend/):
+    python -m benchmarks.db_concurrency [--rate 10] [--requests 300] [--members 500] [--write-share 0.2]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.bliz import RegionLocale
+from core.catalogue import GameDataCatalogue
+from database import upsert_characters, GUILD_MEMBER_FIELDS
+from models import Character, Guild, Roster, RosterCharacter, CharacterRole, RosterStatus
+from routes.roster import prepare_roster_response, select_rosters
+
+GUILD_ID = 1
+REGION = "us"
+ROSTERS = 10
+ROSTER_SIZE = 30
+TICK_SECONDS = 0.01
+
+CATALOGUE = GameDataCatalogue.from_indexes(
+    RegionLocale(),
+    {"races": [{"id": 2, "name": "Orc"}]},
+    {"classes": [{"id": 1, "name": "Warrior"}]},
+    {"realms": [{"id": 1, "name": "Kel'Thuzad"}]},
+    {}
+)
+
+
+def members(count, rng):
+    return [
+        {
+            "bnet_id": 1_000_000 + i,
+            "name": f"Member{i}",
+            "realm": "kelthuzad",
+            "level": 80,
+            "faction": "HORDE",
+            "guild_rank": rng.randint(1, 9),
+            "playable_class": 1,
+            "playable_race": 2,
+            "guild_id": GUILD_ID
+        }
+        for i in range(count)
+    ]
+
+
+def populate(path, count):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Guild(id=GUILD_ID, bnet_id=GUILD_ID, region=REGION, name="Bench", realm="kelthuzad", faction="HORDE"))
+        session.flush()
+        upsert_characters(session, REGION, members(count, random.Random(0)), GUILD_MEMBER_FIELDS)
+        character_ids = session.exec(select(Character.id).order_by(Character.bnet_id)).all()
+        for roster_id in range(1, ROSTERS + 1):
+            session.add(Roster(id=roster_id, name=f"Roster {roster_id}", size=ROSTER_SIZE, guild_id=GUILD_ID))
+            for slot in range(ROSTER_SIZE):
+                session.add(RosterCharacter(
+                    roster_id=roster_id,
+                    character_id=character_ids[(roster_id * ROSTER_SIZE + slot) % count],
+                    role=CharacterRole.DAMAGE,
+                    status=RosterStatus.ACTIVE
+                ))
+        session.commit()
+    engine.dispose()
+
+
+def rosters_query():
+    return select_rosters().where(Roster.guild_id == GUILD_ID).order_by(Roster.updated_at.desc())
+
+
+class SyncBackend:
+    """What the routes did before: a blocking Session inside async handlers"""
+    name = "sync Session"
+
+    def __init__(self, path):
+        self.engine = create_engine(f"sqlite:///{path}")
+
+    async def read(self):
+        with Session(self.engine) as db:
+            rosters = db.exec(rosters_query()).all()
+            return [await prepare_roster_response(roster, CATALOGUE) for roster in rosters]
+
+    async def write(self, rows):
+        with Session(self.engine) as db:
+            db.get(Guild, GUILD_ID)
+            upsert_characters(db, REGION, rows, GUILD_MEMBER_FIELDS)
+            db.commit()
+
+    async def close(self):
+        self.engine.dispose()
+
+
+class AsyncBackend:
+    """database.get_db: an AsyncSession over aiosqlite"""
+    name = "AsyncSession"
+
+    def __init__(self, path):
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    async def read(self):
+        async with AsyncSession(self.engine, expire_on_commit=False) as db:
+            rosters = (await db.exec(rosters_query())).all()
+            return [await prepare_roster_response(roster, CATALOGUE) for roster in rosters]
+
+    async def write(self, rows):
+        async with AsyncSession(self.engine, expire_on_commit=False) as db:
+            await db.get(Guild, GUILD_ID)
+            await db.run_sync(upsert_characters, REGION, rows, GUILD_MEMBER_FIELDS)
+            await db.commit()
+
+    async def close(self):
+        await self.engine.dispose()
+
+
+async def ticker(stop, lags):
+    """Wakes on a fixed period and records how late each wake-up was"""
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def request(kind, call, arrival, latencies, failures):
+    try:
+        await call
+    except OperationalError:
+        failures[kind] += 1
+        return
+    latencies[kind].append(time.perf_counter() - arrival)
+
+
+async def traffic(backend, rate, requests, count, write_share, latencies, failures):
+    """Poisson arrivals at ``rate`` per second, each request its own task"""
+    rng = random.Random(42)
+    tasks = []
+    arrival = time.perf_counter()
+    for _ in range(requests):
+        arrival += rng.expovariate(rate)
+        await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+        if rng.random() < write_share:
+            kind, call = "write", backend.write(members(count, rng))
+        else:
+            kind, call = "read", backend.read()
+        tasks.append(asyncio.create_task(request(kind, call, arrival, latencies, failures)))
+    await asyncio.gather(*tasks)
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        return "-"
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return " ".join(
+        f"{label} {value * 1000:>7.1f}"
+        for label, value in (("p50", cuts[49]), ("p95", cuts[94]), ("p99", cuts[98]), ("max", max(samples)))
+    )
+
+
+async def run(backend_class, path, rate, requests, count, write_share):
+    backend = backend_class(path)
+    latencies = {"read": [], "write": []}
+    failures = {"read": 0, "write": 0}
+    lags = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(stop, lags))
+
+    started = time.perf_counter()
+    await traffic(backend, rate, requests, count, write_share, latencies, failures)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+    await backend.close()
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{backend.name}: {total} requests in {elapsed:.2f} s, latency in ms")
+    for kind, samples in latencies.items():
+        print(f"  {kind:<7} {len(samples):>5}  {percentiles(samples)}  failed {failures[kind]}")
+    print(f"  {'ticker':<7} {len(lags):>5}  {percentiles(lags)}")
+
+
+def main(rate, requests, count, write_share):
+    for backend_class in (SyncBackend, AsyncBackend):
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        populate(path, count)
+        asyncio.run(run(backend_class, path, rate, requests, count, write_share))
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=10, help="requests per second")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--write-share", type=float, default=0.2)
+    args = parser.parse_args()
+    main(args.rate, args.requests, args.members, args.write_share)
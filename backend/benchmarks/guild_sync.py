@@ -0,0 +1,115 @@
+"""
+Guild roster sync: per-member queries versus the bulk upsert.
+
+Syncs a synthetic guild into a scratch SQLite database three times, first
+into an empty table, then unchanged, then with some members promoted, and
+reports wall time and statements executed for the old per-member loop from
+get_guild_data and for database.upsert_characters.
+
+Usage (from backend/):
+    python -m benchmarks.guild_sync [--members 1000] [--changed 0.05]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from database import upsert_characters, GUILD_MEMBER_FIELDS
+from models import Character, Guild
+
+GUILD_ID = 1
+REGION = "us"
+
+
+def synthetic_members(count):
+    rng = random.Random(42)
+    return [
+        {
+            "bnet_id": 1_000_000 + i,
+            "name": f"Member{i}",
+            "realm": "kelthuzad",
+            "level": 80,
+            "faction": "HORDE",
+            "guild_rank": rng.randint(1, 9),
+            "playable_class": rng.randint(1, 13),
+            "playable_race": rng.randint(1, 37),
+            "guild_id": GUILD_ID
+        }
+        for i in range(count)
+    ]
+
+
+def promote(members, fraction):
+    rng = random.Random(7)
+    promoted = [dict(member) for member in members]
+    for member in rng.sample(promoted, int(len(promoted) * fraction)):
+        member["guild_rank"] = max(1, member["guild_rank"] - 1) if member["guild_rank"] > 1 else 2
+    return promoted
+
+
+def sync_per_member(session, members):
+    """The loop get_guild_data used before the bulk path"""
+    for member in members:
+        existing = session.exec(select(Character).where(
+            Character.region == REGION, Character.bnet_id == member["bnet_id"]
+        )).first()
+        if existing:
+            for field in GUILD_MEMBER_FIELDS:
+                setattr(existing, field, member[field])
+            session.add(existing)
+        else:
+            session.add(Character(region=REGION, **member))
+    session.commit()
+
+
+def sync_bulk(session, members):
+    upsert_characters(session, REGION, members, GUILD_MEMBER_FIELDS)
+    session.commit()
+
+
+def run(label, sync, members, changed):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Guild(id=GUILD_ID, bnet_id=GUILD_ID, region=REGION, name="Bench", realm="kelthuzad", faction="HORDE"))
+        session.commit()
+
+    statements = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*args):
+        statements[0] += 1
+
+    print(label)
+    for phase, roster in (
+        ("initial sync", members),
+        ("unchanged resync", members),
+        (f"{changed:.0%} promoted", promote(members, changed)),
+    ):
+        statements[0] = 0
+        with Session(engine) as session:
+            started = time.perf_counter()
+            sync(session, roster)
+            elapsed = time.perf_counter() - started
+        print(f"  {phase:<18} {elapsed * 1000:>9.1f} ms {statements[0]:>7} statements")
+    engine.dispose()
+    os.remove(path)
+
+
+def main(count, changed):
+    members = synthetic_members(count)
+    run("before: select per member", sync_per_member, members, changed)
+    run("after: bulk upsert", sync_bulk, members, changed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--changed", type=float, default=0.05)
+    args = parser.parse_args()
+    main(args.members, args.changed)
@@ -0,0 +1,164 @@
+"""
+Roster read path: statements per request, lazy loading versus eager loading.
+
+Fills a scratch SQLite database with a guild and its rosters, calls the
+/guild/{realm}/{guild}/rosters and /guild/{realm}/{guild}/{roster_id}
+handlers directly and counts the statements each one executes. The eager
+loading query in routes.roster must issue the same number of statements
+whatever the number and size of rosters; the script exits non-zero if it
+does not. tests/test_roster_queries.py asserts the exact counts.
+
+Usage (from backend/):
+    python -m benchmarks.roster_queries [--rosters 10] [--size 30]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.bliz import RegionLocale
+from core.catalogue import GameDataCatalogue
+from models import (
+    User, Guild, Roster, Character, RosterCharacter,
+    CharacterRole, RosterStatus
+)
+from routes import roster as roster_routes
+
+GUILD_ID = 1
+REALM = "kelthuzad"
+GUILD = "Bench"
+REGION = "us"
+
+
+class StaticCatalogues:
+    """CatalogueStore stand-in that serves one in-memory catalogue"""
+
+    def __init__(self, region_locale):
+        self.catalogue = GameDataCatalogue.from_indexes(
+            region_locale,
+            {"races": [{"id": 2, "name": "Orc"}]},
+            {"classes": [{"id": 1, "name": "Warrior"}]},
+            {"realms": [{"id": 1, "name": "Kel'Thuzad"}]},
+            {}
+        )
+
+    async def get(self, region_locale, access_token):
+        return self.catalogue
+
+
+def populate(session, rosters, size):
+    session.add(Guild(id=GUILD_ID, bnet_id=GUILD_ID, region=REGION, name=GUILD, realm=REALM, faction="HORDE", roster_creation_rank=1))
+    session.add(User(id=1, battle_net_id=1, battle_tag="Officer#1"))
+    session.add(Character(
+        id=1, bnet_id=1, region=REGION, name="Officer", realm=REALM, guild_id=GUILD_ID, guild_rank=0, user_id=1
+    ))
+    # Every roster gets its own characters, plus a few from outside the guild
+    for roster_id in range(1, rosters + 1):
+        session.add(Roster(id=roster_id, name=f"Roster {roster_id}", size=max(size, 10), guild_id=GUILD_ID))
+        for slot in range(size):
+            char_id = roster_id * 1000 + slot
+            session.add(Character(
+                id=char_id, bnet_id=char_id, region=REGION, name=f"Member{char_id}", realm=REALM, level=80,
+                playable_class=1, playable_race=2, guild_rank=5,
+                guild_id=GUILD_ID if slot % 10 else None
+            ))
+            session.add(RosterCharacter(
+                roster_id=roster_id, character_id=char_id,
+                role=CharacterRole.DAMAGE, status=RosterStatus.ACTIVE
+            ))
+    session.commit()
+
+
+def load_lazily(session):
+    """The query get_guild_rosters ran before eager loading, followed by the
+    lazy loads prepare_roster_response used to trigger"""
+    rosters = session.exec(select(Roster).where(Roster.guild_id == GUILD_ID)).all()
+    for roster in rosters:
+        roster.guild
+        for roster_character in roster.roster_characters:
+            roster_character.is_guild_member()
+    return rosters
+
+
+async def lazy_rosters(session, catalogue):
+    # Lazy loading needs a sync session; run_sync provides one
+    rosters = await session.run_sync(load_lazily)
+    return [await roster_routes.prepare_roster_response(roster, catalogue) for roster in rosters]
+
+
+async def count_statements(engine, call):
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            result = await call(session)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+    return statements[0], result
+
+
+async def measure(rosters, size):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        await session.run_sync(populate, rosters, size)
+        user = await session.get(User, 1)
+
+    region_locale = RegionLocale()
+    catalogues = StaticCatalogues(region_locale)
+
+    counts = {}
+    counts["lazy"], lazy = await count_statements(
+        engine, lambda session: lazy_rosters(session, catalogues.catalogue)
+    )
+    counts["rosters"], eager = await count_statements(
+        engine, lambda session: roster_routes.get_guild_rosters(
+            REALM, GUILD, user, session, region_locale, catalogues
+        )
+    )
+    counts["roster"], _ = await count_statements(
+        engine, lambda session: roster_routes.get_roster(
+            REALM, GUILD, 1, user, session, region_locale, catalogues
+        )
+    )
+    await engine.dispose()
+    os.remove(path)
+
+    key = lambda response: response["id"]
+    if sorted(lazy, key=key) != sorted(eager, key=key):
+        sys.exit("eager loaded rosters differ from the lazy loaded ones")
+    return counts
+
+
+def main(rosters, size):
+    print(f"{'rosters x size':<16} {'lazy':>8} {'/rosters':>9} {'/roster':>8}")
+    results = []
+    for shape in ((1, 10), (rosters, size)):
+        counts = asyncio.run(measure(*shape))
+        results.append(counts)
+        print(f"{f'{shape[0]} x {shape[1]}':<16} {counts['lazy']:>8} {counts['rosters']:>9} {counts['roster']:>8}")
+
+    small, large = results
+    if small["rosters"] != large["rosters"] or small["roster"] != large["roster"]:
+        sys.exit("roster statements grow with the number of rosters or characters")
+    print("statements per request are constant")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rosters", type=int, default=10)
+    parser.add_argument("--size", type=int, default=30)
+    args = parser.parse_args()
+    main(args.rosters, args.size)
@@ -1,15 +1,29 @@
+import json
 import os
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Optional, Tuple, Iterable, Union, AsyncIterator, Hashable
 from dataclasses import dataclass
 from enum import Enum
 import aiohttp
 from dotenv import load_dotenv
-from aiolimiter import AsyncLimiter
-from contextlib import asynccontextmanager
 import asyncio
 from functools import wraps
 
-from .cache import cache_api_response
+from .cache import cache_api_response, forced_refresh, parse_cache_key, read_entries, prefetched_entries
+from .projection import resolve_projection
+from .ratelimit import DistributedRateLimiter, Priority
+from .connections import ConnectionManager
+from .log import log
+from .metrics import UPSTREAM_RETRIES, UPSTREAM_FAILURES
+from .retry import (
+    RetryPolicy,
+    RetryBudget,
+    CircuitBreaker,
+    BlizzardAPIError,
+    UpstreamTimeout,
+    UpstreamUnavailable,
+    parse_retry_after,
+)
 
 load_dotenv()
 
@@ -44,14 +58,65 @@ class Namespace(Enum):
     PROFILE = "profile"
 
 
-@dataclass
+# Battle.net OAuth hosts; Korea and Taiwan share the APAC host
+OAUTH_URLS = {
+    Region.US: "https://us.battle.net/oauth",
+    Region.EU: "https://eu.battle.net/oauth",
+    Region.KR: "https://apac.battle.net/oauth",
+    Region.TW: "https://apac.battle.net/oauth",
+    Region.CN: "https://www.battlenet.com.cn/oauth"
+}
+
+# Send every region to another host instead, such as the local stand-in in
+# benchmarks/bnet_standin.py
+BNET_API_URL = os.getenv("BNET_API_URL")
+BNET_OAUTH_URL = os.getenv("BNET_OAUTH_URL")
+
+
+def api_url(region: Region) -> str:
+    return BNET_API_URL or region.value
+
+
+def oauth_url(region: Region) -> str:
+    return BNET_OAUTH_URL or OAUTH_URLS[region]
+
+
+# Locale used when a request names a region but no locale
+DEFAULT_LOCALES = {
+    Region.US: Locale.EN_US,
+    Region.EU: Locale.EN_GB,
+    Region.KR: Locale.KO_KR,
+    Region.TW: Locale.ZH_TW,
+    Region.CN: Locale.ZH_CN
+}
+
+
+@dataclass(frozen=True)
 class RegionLocale:
     region: Region = Region.US
     locale: Locale = Locale.EN_US
 
+    @classmethod
+    def from_params(cls, region: str = "us", locale: Optional[str] = None) -> "RegionLocale":
+        """Build from query parameters such as region=eu&locale=de_DE."""
+        try:
+            region_enum = Region[region.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown region: {region}")
+        if locale is None:
+            return cls(region_enum, DEFAULT_LOCALES[region_enum])
+        try:
+            return cls(region_enum, Locale(locale))
+        except ValueError:
+            raise ValueError(f"Unknown locale: {locale}")
+
     @property
     def region_url(self):
-        return self.region.value
+        return api_url(self.region)
+
+    @property
+    def oauth_url(self):
+        return oauth_url(self.region)
 
     @property
     def locale_value(self):
@@ -61,81 +126,285 @@ class RegionLocale:
         return f"{namespace.value}-{self.region.name.lower()}"
 
 
+# Game data does not depend on the user, so it is requested with the app token
+APP_TOKEN_NAMESPACES = (Namespace.STATIC, Namespace.DYNAMIC)
+
+
 class BlizzardAPIClient:
-    """Battle.net API client with rate limiting and session management."""
+    """Battle.net API client with rate limiting and pooled connections."""
     
     def __init__(self):
         self.CLIENT_ID = os.getenv("BLIZZARD_CLIENT_ID")
         self.CLIENT_SECRET = os.getenv("BLIZZARD_CLIENT_SECRET")
         self.REDIRECT_URI = 'http://localhost:5173/callback'
         
-        # Rate limiter with 100 requests per second and 36000 per hour
-        self.rate_limiter = AsyncLimiter(100, 1)
-        self.hourly_limiter = AsyncLimiter(36000, 3600)
+        # Rate limiter per region with 100 requests per second and 36000 per
+        # hour, shared through Redis by every worker process
+        self.rate_limiters = {
+            region: DistributedRateLimiter(f"bnet:{region.name.lower()}", [(100, 1), (36000, 3600)])
+            for region in Region
+        }
         
-        # Session cache
-        self._session: Optional[aiohttp.ClientSession] = None
-    
-    @asynccontextmanager
-    async def session(self):
-        """Context manager for aiohttp client session."""
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
-        try:
-            yield self._session
-        finally:
-            # Keep session open for reuse
-            pass
+        # Retries share one budget; failures trip a breaker for their region only
+        self.retry_policy = RetryPolicy()
+        self.retry_budget = RetryBudget()
+        self.circuit_breakers = {region: CircuitBreaker(region.name) for region in Region}
+        
+        # Pooled keep-alive sessions, one per region
+        self.http = ConnectionManager()
+        
+        # Client-credentials token per region as (token, expiry), refreshed
+        # this many seconds before it expires
+        self.APP_TOKEN_REFRESH_MARGIN = 300
+        self._app_tokens: Dict[Region, Tuple[str, float]] = {}
+        self._app_token_locks = {region: asyncio.Lock() for region in Region}
     
     async def close(self):
-        """Close the client session."""
-        if self._session and not self._session.closed:
-            await self._session.close()
+        """Close the pooled sessions."""
+        await self.http.close()
     
     @staticmethod
     def get_state() -> str:
         """Generate a random state for OAuth."""
         return os.urandom(4).hex()
     
-    async def get_access_token(self, code: str) -> Dict[str, Any]:
+    def limiter(self, region: Region = Region.US) -> DistributedRateLimiter:
+        return self.rate_limiters[region]
+    
+    async def get_access_token(self, code: str, region: Region = Region.US) -> Dict[str, Any]:
         """Exchange authorization code for access token."""
-        async with self.rate_limiter:
-            async with self.hourly_limiter:
-                token_url = "https://us.battle.net/oauth/token"
-                payload = {
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "redirect_uri": self.REDIRECT_URI,
-                    "client_id": self.CLIENT_ID,
-                    "client_secret": self.CLIENT_SECRET,
-                    "state": self.get_state()
-                }
+        async with self.limiter(region):
+            token_url = f"{oauth_url(region)}/token"
+            payload = {
+                "grant_type": "authorization_code",
+                "code": code,
+                "redirect_uri": self.REDIRECT_URI,
+                "client_id": self.CLIENT_ID,
+                "client_secret": self.CLIENT_SECRET,
+                "state": self.get_state()
+            }
                 
-                async with self.session() as session:
-                    async with session.post(token_url, data=payload) as response:
-                        return await response.json()
+            async with self.http.request(region.name, "POST", token_url, data=payload) as response:
+                return await response.json()
+    
+    async def get_user_info(self, access_token: str, region: Region = Region.US) -> Dict[str, Any]:
+        """Fetch the OAuth userinfo for a user token."""
+        async with self.limiter(region):
+            user_info_url = f"{oauth_url(region)}/userinfo"
+            headers = {"Authorization": f"Bearer {access_token}"}
+            async with self.http.request(region.name, "GET", user_info_url, headers=headers) as response:
+                return await response.json()
+    
+    def get_authorize_url(self, state: str, region: Region = Region.US) -> str:
+        return (
+            f"{oauth_url(region)}/authorize?"
+            f"response_type=code"
+            f"&state={state}"
+            f"&client_id={self.CLIENT_ID}"
+            f"&redirect_uri={self.REDIRECT_URI}"
+            f"&scope=openid%20profile%20email%20battlenet-profile-read%20battlenet-account-read%20wow.profile"
+        )
+    
+    @property
+    def has_app_credentials(self) -> bool:
+        return bool(self.CLIENT_ID and self.CLIENT_SECRET)
+    
+    def _current_app_token(self, region: Region, margin: float = 0) -> Optional[str]:
+        token, expires_at = self._app_tokens.get(region, (None, 0.0))
+        if token and time.monotonic() < expires_at - margin:
+            return token
+        return None
+    
+    async def get_app_token(self, region: Region = Region.US) -> Optional[str]:
+        """Return a client-credentials token, fetching a new one shortly before expiry."""
+        if not self.has_app_credentials:
+            return None
+        token = self._current_app_token(region, self.APP_TOKEN_REFRESH_MARGIN)
+        if token:
+            return token
+        
+        async with self._app_token_locks[region]:
+            # Another caller may have refreshed while we waited for the lock
+            token = self._current_app_token(region, self.APP_TOKEN_REFRESH_MARGIN)
+            if token:
+                return token
+            
+            try:
+                async with self.limiter(region):
+                    auth = aiohttp.BasicAuth(self.CLIENT_ID, self.CLIENT_SECRET)
+                    async with self.http.request(
+                        region.name,
+                        "POST",
+                        f"{oauth_url(region)}/token",
+                        data={"grant_type": "client_credentials"},
+                        auth=auth
+                    ) as response:
+                        if response.status != 200:
+                            return self._current_app_token(region)
+                        token_data = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                # Keep using the old token while it lasts, otherwise the caller's
+                return self._current_app_token(region)
+            
+            token = token_data["access_token"]
+            self._app_tokens[region] = (token, time.monotonic() + token_data.get("expires_in", 86400))
+            return token
     
     @cache_api_response
     async def make_request(
         self,
         endpoint: str,
-        access_token: str,
+        access_token: Optional[str],
         region_locale: Optional[RegionLocale] = None,
         namespace: Optional[Namespace] = None,
         construct_endpoint: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline: Optional[float] = None,
+        raw: bool = False,
         **kwargs
     ) -> Optional[Dict[str, Any]]:
-        """Make a generic request to the Battle.net API with rate limiting."""
-        async with self.rate_limiter:
-            async with self.hourly_limiter:
-                if region_locale is None:
-                    region_locale = RegionLocale()
-                
-                url = self._construct_url(endpoint, region_locale, construct_endpoint)
-                headers = {"Authorization": f"Bearer {access_token}"}
-                params = self._construct_params(region_locale, namespace, kwargs)
-                
-                return await self._execute_request(url, headers, params)
+        """
+        Make a generic request to the Battle.net API with rate limiting.
+        
+        Returns None when Battle.net answers with a client error such as 404,
+        and raises a BlizzardAPIError subclass when it could not answer.
+        Responses are trimmed to the fields listed in core.projection unless
+        ``raw`` is set.
+        """
+        if region_locale is None:
+            region_locale = RegionLocale()
+        
+        if namespace in APP_TOKEN_NAMESPACES:
+            access_token = await self.get_app_token(region_locale.region) or access_token
+        if not access_token:
+            return None
+        
+        url = self._construct_url(endpoint, region_locale, construct_endpoint)
+        headers = {"Authorization": f"Bearer {access_token}"}
+        params = self._construct_params(region_locale, namespace, kwargs)
+        
+        return await self._execute_request(url, headers, params, region_locale.region, priority, deadline)
+    
+    async def fetch_many(
+        self,
+        endpoints: Union[Iterable[str], Dict[Hashable, str]],
+        access_token: Optional[str],
+        region_locale: Optional[RegionLocale] = None,
+        namespace: Optional[Namespace] = None,
+        construct_endpoint: bool = True,
+        priority: Priority = Priority.BULK,
+        concurrency: int = 8,
+        item_deadline: float = 5.0
+    ) -> AsyncIterator[Tuple[Hashable, Optional[Dict[str, Any]]]]:
+        """
+        Fetch a batch of endpoints, yielding (key, data) pairs as they complete.
+        
+        Keys are the dict keys when a mapping is given, otherwise the endpoints
+        themselves. Repeated endpoints are fetched once, at most ``concurrency``
+        requests run at a time, and an item that fails or misses its deadline
+        yields None without holding up the rest of the batch. The cached
+        entries of the whole batch are read from Redis in one round trip.
+        """
+        if not isinstance(endpoints, dict):
+            endpoints = {endpoint: endpoint for endpoint in endpoints}
+        
+        keys_by_endpoint: Dict[str, list] = {}
+        for key, endpoint in endpoints.items():
+            keys_by_endpoint.setdefault(endpoint, []).append(key)
+        
+        def request(endpoint):
+            return dict(
+                endpoint=endpoint,
+                access_token=access_token,
+                region_locale=region_locale,
+                namespace=namespace,
+                construct_endpoint=construct_endpoint,
+                priority=priority,
+                deadline=item_deadline
+            )
+        
+        entries = await read_entries(
+            self.make_request.cache_key(self, **request(endpoint)) for endpoint in keys_by_endpoint
+        )
+        
+        pending: asyncio.Queue = asyncio.Queue()
+        for endpoint in keys_by_endpoint:
+            pending.put_nowait(endpoint)
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def worker():
+            while not pending.empty():
+                endpoint = pending.get_nowait()
+                try:
+                    with prefetched_entries(entries):
+                        data = await asyncio.wait_for(self.make_request(**request(endpoint)), item_deadline)
+                except (BlizzardAPIError, asyncio.TimeoutError):
+                    data = None
+                except Exception as e:
+                    # The consumer waits for one result per endpoint, so a
+                    # worker must never die without putting one
+                    log.error(f"Error fetching {endpoint}: {str(e)}")
+                    data = None
+                await results.put((endpoint, data))
+        
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(concurrency, len(keys_by_endpoint)))
+        ]
+        try:
+            for _ in range(len(keys_by_endpoint)):
+                endpoint, data = await results.get()
+                for key in keys_by_endpoint[endpoint]:
+                    yield key, data
+        finally:
+            # The caller may stop iterating early
+            for task in workers:
+                task.cancel()
+    
+    async def fetch_all(self, endpoints: Union[Iterable[str], Dict[Hashable, str]], access_token: Optional[str], **kwargs) -> Dict[Hashable, Optional[Dict[str, Any]]]:
+        """Collect fetch_many results into a dict keyed like the input."""
+        return {key: data async for key, data in self.fetch_many(endpoints, access_token, **kwargs)}
+    
+    async def refresh_cached(self, cache_keys: Iterable[str], access_token: Optional[str], concurrency: int = 8) -> Dict[str, bool]:
+        """
+        Refetch cached responses in place, reporting which keys were refreshed.
+        
+        Entries partitioned by user are skipped, since another user's token
+        would not rebuild them.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def refresh(cache_key: str) -> bool:
+            parts = parse_cache_key(cache_key)
+            if not parts or parts["user"]:
+                return False
+            # Keys only ever hold paths, since create_cache_key strips the
+            # scheme and host, so the URL is rebuilt on the region's host
+            endpoint = parts["endpoint"]
+            try:
+                region_locale = RegionLocale.from_params(parts["region"], parts["locale"])
+            except ValueError:
+                return False
+            async with semaphore:
+                try:
+                    with forced_refresh():
+                        data = await self.make_request(
+                            endpoint=endpoint,
+                            access_token=access_token,
+                            region_locale=region_locale,
+                            namespace=Namespace(parts["namespace"]) if parts["namespace"] else None,
+                            priority=Priority.BULK,
+                            raw=not parts["fields"] and resolve_projection(endpoint) is not None,
+                            **json.loads(parts["params"] or "{}")
+                        )
+                except BlizzardAPIError as e:
+                    log.warning(f"Could not refresh {cache_key}: {str(e)}")
+                    return False
+            return data is not None
+        
+        cache_keys = list(cache_keys)
+        results = await asyncio.gather(*(refresh(cache_key) for cache_key in cache_keys))
+        return dict(zip(cache_keys, results))
     
     def _construct_url(self, endpoint: str, region_locale: RegionLocale, construct: bool) -> str:
         """Construct the API URL."""
@@ -159,24 +428,89 @@ class BlizzardAPIClient:
         self,
         url: str,
         headers: Dict[str, str],
-        params: Dict[str, Any]
+        params: Dict[str, Any],
+        region: Region = Region.US,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline: Optional[float] = None
     ) -> Optional[Dict[str, Any]]:
-        """Execute the HTTP request."""
-        try:
-            async with self.session() as session:
-                async with session.get(url, headers=headers, params=params) as response:
+        """Execute the HTTP request, retrying throttling and server errors until the deadline."""
+        breaker = self.circuit_breakers[region]
+        expires_at = time.monotonic() + (deadline or self.retry_policy.deadline)
+        self.retry_budget.record_request()
+        attempt = 0
+        
+        while True:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise UpstreamTimeout(f"Deadline exceeded for {url}")
+            breaker.check()
+            
+            # Waiting for the limiter counts against the deadline, and the slot
+            # covers one attempt, never the backoff sleep
+            try:
+                await asyncio.wait_for(self.limiter(region).acquire(priority), remaining)
+            except asyncio.TimeoutError:
+                # Nothing went upstream, so the region's health is unknown
+                breaker.release()
+                raise UpstreamTimeout(f"Deadline exceeded waiting for a rate limit slot for {url}")
+            except BaseException:
+                breaker.release()
+                raise
+            remaining = expires_at - time.monotonic()
+            
+            retry_after = None
+            try:
+                async with self.http.request(
+                    region.name,
+                    "GET",
+                    url,
+                    total_timeout=remaining,
+                    headers=headers,
+                    params=params
+                ) as response:
                     if response.status == 200:
-                        return await response.json()
+                        data = await response.json()
+                        breaker.record_success()
+                        return data
                     elif response.status == 429:
-                        # Handle rate limiting at API level
-                        retry_after = int(response.headers.get('Retry-After', 60))
-                        await asyncio.sleep(retry_after)
-                        return await self._execute_request(url, headers, params)
-                    elif response.status >= 400:
+                        # Throttled: back off, but the region is healthy
+                        breaker.record_success()
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        error = UpstreamUnavailable(f"Rate limited by Battle.net for {url}")
+                        reason = "throttled"
+                    elif response.status >= 500:
+                        breaker.record_failure()
+                        error = UpstreamUnavailable(f"Battle.net returned {response.status} for {url}")
+                        reason = "server_error"
+                    else:
+                        # Client errors such as 404 are answers, not failures
+                        breaker.record_success()
                         return None
-                    return None
-        except Exception:
-            return None
+            except asyncio.TimeoutError:
+                breaker.record_failure()
+                error = UpstreamTimeout(f"Timed out waiting for {url}")
+                reason = "timeout"
+            except (aiohttp.ClientError, ValueError) as e:
+                breaker.record_failure()
+                error = UpstreamUnavailable(f"Request to {url} failed: {str(e)}")
+                reason = "connection"
+            except BaseException:
+                # Cancellation or an unexpected error says nothing about the
+                # region, but must not leave a half-open trial outstanding
+                breaker.release()
+                raise
+            
+            attempt += 1
+            delay = self.retry_policy.backoff(attempt, retry_after)
+            if (
+                attempt >= self.retry_policy.max_attempts
+                or time.monotonic() + delay >= expires_at
+                or not self.retry_budget.try_spend()
+            ):
+                UPSTREAM_FAILURES.labels(region.name, reason).inc()
+                raise error
+            UPSTREAM_RETRIES.labels(region.name, reason).inc()
+            await asyncio.sleep(delay)
     
     # Profile methods
     async def get_wow_profile(self, access_token: str, region_locale: Optional[RegionLocale] = None):
@@ -245,56 +579,71 @@ class BlizzardAPIClient:
         )
     
     # Game data methods
-    async def get_playable_race_index(self, access_token: str, region_locale: Optional[RegionLocale] = None):
+    async def get_playable_race_index(self, access_token: Optional[str] = None, region_locale: Optional[RegionLocale] = None, priority: Priority = Priority.INTERACTIVE):
         return await self.make_request(
             endpoint="/data/wow/playable-race/index",
             access_token=access_token,
             region_locale=region_locale,
-            namespace=Namespace.STATIC
+            namespace=Namespace.STATIC,
+            priority=priority
         )
     
-    async def get_playable_class_index(self, access_token: str, region_locale: Optional[RegionLocale] = None):
+    async def get_playable_class_index(self, access_token: Optional[str] = None, region_locale: Optional[RegionLocale] = None, priority: Priority = Priority.INTERACTIVE):
         return await self.make_request(
             endpoint="/data/wow/playable-class/index",
             access_token=access_token,
             region_locale=region_locale,
-            namespace=Namespace.STATIC
+            namespace=Namespace.STATIC,
+            priority=priority
         )
     
-    async def get_realm_index(self, access_token: str, region_locale: Optional[RegionLocale] = None):
+    async def get_realm_index(self, access_token: Optional[str] = None, region_locale: Optional[RegionLocale] = None, priority: Priority = Priority.INTERACTIVE):
         return await self.make_request(
             endpoint="/data/wow/realm/index",
             access_token=access_token,
             region_locale=region_locale,
-            namespace=Namespace.DYNAMIC
+            namespace=Namespace.DYNAMIC,
+            priority=priority
         )
     
     # Media methods
-    async def get_spec_media(self, access_token: str, spec_id: int, region_locale: Optional[RegionLocale] = None):
+    async def get_spec_media(self, access_token: Optional[str], spec_id: int, region_locale: Optional[RegionLocale] = None, priority: Priority = Priority.BULK):
         return await self.make_request(
             endpoint=f"/data/wow/media/playable-specialization/{spec_id}",
             access_token=access_token,
             region_locale=region_locale,
-            namespace=Namespace.STATIC
+            namespace=Namespace.STATIC,
+            priority=priority
         )
     
-    async def get_class_media(self, access_token: str, class_id: int, region_locale: Optional[RegionLocale] = None):
+    async def get_class_media(self, access_token: Optional[str], class_id: int, region_locale: Optional[RegionLocale] = None, priority: Priority = Priority.BULK):
         return await self.make_request(
             endpoint=f"/data/wow/media/playable-class/{class_id}",
             access_token=access_token,
             region_locale=region_locale,
-            namespace=Namespace.STATIC
+            namespace=Namespace.STATIC,
+            priority=priority
+        )
+    
+    async def get_class_media_many(self, access_token: Optional[str], class_ids: Iterable[int], region_locale: Optional[RegionLocale] = None, priority: Priority = Priority.BULK):
+        return await self.fetch_all(
+            {class_id: f"/data/wow/media/playable-class/{class_id}" for class_id in class_ids},
+            access_token,
+            region_locale=region_locale,
+            namespace=Namespace.STATIC,
+            priority=priority
         )
     
-    async def get_item_media(self, access_token: str, media_url: str, region_locale: Optional[RegionLocale] = None):
+    async def get_item_media(self, access_token: str, media_url: str, region_locale: Optional[RegionLocale] = None, priority: Priority = Priority.BULK):
         return await self.make_request(
             endpoint=media_url,
             access_token=access_token,
             region_locale=region_locale,
-            construct_endpoint=False
+            construct_endpoint=False,
+            priority=priority
         )
     
-from fastapi import Request
+from fastapi import Request, HTTPException
 
 async def get_blizzard_client(request: Request) -> BlizzardAPIClient:
     """
@@ -306,6 +655,18 @@ async def get_blizzard_client(request: Request) -> BlizzardAPIClient:
     """
     return request.app.state.blizzard_client
 
+async def get_region_locale(region: str = "us", locale: Optional[str] = None) -> RegionLocale:
+    """
+    Dependency injection function for the region and locale of a request.
+    
+    Routes accept ?region=eu&locale=de_DE; the locale defaults to the region's
+    primary language.
+    """
+    try:
+        return RegionLocale.from_params(region, locale)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Create a global instance
 bliz_client = BlizzardAPIClient()
 
@@ -313,8 +674,8 @@ bliz_client = BlizzardAPIClient()
 def get_state():
     return bliz_client.get_state()
 
-async def get_access_token(code):
-    return await bliz_client.get_access_token(code)
+async def get_access_token(code, region=Region.US):
+    return await bliz_client.get_access_token(code, region)
 
 # Re-export all the methods for backward compatibility
 get_wow_profile = bliz_client.get_wow_profile
@@ -1,24 +1,102 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 import json
 import redis
+import redis.asyncio as aioredis
 from functools import wraps
 import asyncio
 from enum import Enum
 import os
 import dotenv
 import hashlib
+import inspect
+import re
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+from .codec import CodecError, entry_codec
+from .log import log
+from .metrics import CACHE_LOOKUPS
+from .projection import resolve_projection
 
 dotenv.load_dotenv()
 
 # Single Redis client instance
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+
+# Connection pool shared by every cache operation in this process
+redis_pool = aioredis.ConnectionPool.from_url(
+    REDIS_URL,
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS
+)
 
 def get_redis_client():
     """Single point of access for Redis client"""
-    return redis.from_url(REDIS_URL, decode_responses=True)
+    return aioredis.Redis(connection_pool=redis_pool)
 
 redis_client = get_redis_client()
 
+# Cached API responses are packed binary entries, so they get a pool that
+# leaves values as bytes
+binary_redis_pool = aioredis.ConnectionPool.from_url(
+    REDIS_URL,
+    decode_responses=False,
+    max_connections=REDIS_MAX_CONNECTIONS
+)
+binary_redis_client = aioredis.Redis(connection_pool=binary_redis_pool)
+
+async def close_redis():
+    """Release pooled Redis connections on shutdown"""
+    await redis_pool.disconnect()
+    await binary_redis_pool.disconnect()
+
+async def read_entries(keys):
+    """
+    Read several packed cache entries in one MGET round trip.
+
+    Returns {key: entry or None}, or an empty dict when Redis is unavailable
+    so callers fall back to reading each key themselves.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    try:
+        return dict(zip(keys, await binary_redis_client.mget(keys)))
+    except redis.RedisError as e:
+        log.warning(f"Could not read {len(keys)} cache entries: {str(e)}")
+        return {}
+
+# Keys written before entries were keyed by namespace, region and locale.
+# They were stored without a TTL, so nothing else ever removes them
+LEGACY_KEY_PATTERN = "make_request:*"
+LEGACY_PURGE_MARKER = "maintenance:legacy-keys-purged"
+
+async def purge_legacy_keys(batch_size=500):
+    """
+    Unlink every legacy make_request entry once per Redis instance and return how many there were.
+
+    The marker keeps concurrent workers and later restarts from scanning again.
+    """
+    if not await redis_client.set(LEGACY_PURGE_MARKER, "running", nx=True, ex=3600):
+        return 0
+    purged = 0
+    batch = []
+    async for key in redis_client.scan_iter(match=LEGACY_KEY_PATTERN, count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            purged += await redis_client.unlink(*batch)
+            batch = []
+    if batch:
+        purged += await redis_client.unlink(*batch)
+    await redis_client.set(LEGACY_PURGE_MARKER, "done")
+    return purged
+
 class CacheType(Enum):
     PROFILE = "profile"
     DYNAMIC = "dynamic"
@@ -32,69 +110,590 @@ CACHE_EXPIRY = {
     CacheType.SIMC: timedelta(hours=1)
 }
 
-def determine_cache_type(namespace):
-    if namespace == "profile-us":
-        return CacheType.PROFILE
-    elif namespace == "dynamic-us":
-        return CacheType.DYNAMIC
-    elif namespace == "static-us":
-        return CacheType.STATIC
-    return CacheType.PROFILE  # Default to profile if unknown
-
-def create_cache_key(func_name, args, kwargs):
-    args_str = ':'.join(str(arg) if not isinstance(arg, dict) else json.dumps(arg, sort_keys=True) for arg in args)
-    kwargs_str = ':'.join(f"{k}={v if not isinstance(v, dict) else json.dumps(v, sort_keys=True)}" 
-                         for k, v in sorted(kwargs.items()))
-    return f"{func_name}:{args_str}:{kwargs_str}"
+# Expired entries younger than expiry + max staleness are served immediately
+# while a background refresh runs; older ones force a synchronous fetch.
+STALE_WHILE_REVALIDATE = os.getenv("CACHE_STALE_WHILE_REVALIDATE", "true").lower() == "true"
+
+CACHE_MAX_STALENESS = {
+    CacheType.PROFILE: timedelta(days=1),
+    CacheType.DYNAMIC: timedelta(days=3),
+    CacheType.STATIC: timedelta(weeks=4),
+    CacheType.SIMC: timedelta(0)
+}
+
+# Lock that keeps workers from refreshing the same key at the same time
+REFRESH_LOCK_SECONDS = 30
+
+# In-process (L1) tier in front of Redis. Profile payloads are mutated by the
+# routes and must reflect rank changes quickly, so they are not held in-process.
+L1_CACHE_TTL = {
+    CacheType.PROFILE: timedelta(0),
+    CacheType.DYNAMIC: timedelta(minutes=10),
+    CacheType.STATIC: timedelta(hours=1),
+    CacheType.SIMC: timedelta(0)
+}
+
+L1_CACHE_MAX_BYTES = {
+    CacheType.PROFILE: 0,
+    CacheType.DYNAMIC: int(os.getenv("L1_CACHE_DYNAMIC_BYTES", 16 * 1024 * 1024)),
+    CacheType.STATIC: int(os.getenv("L1_CACHE_STATIC_BYTES", 32 * 1024 * 1024)),
+    CacheType.SIMC: 0
+}
+
+class LocalCache:
+    """
+    Bounded in-process LRU/TTL cache holding already decoded values.
+
+    Every hit hands out the same object, so callers must treat what they get
+    as read-only; the payloads that routes change in place are profile ones,
+    which are never held here.
+    """
+
+    def __init__(self, ttls, max_bytes):
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self._entries = {cache_type: OrderedDict() for cache_type in CacheType}
+        self._sizes = {cache_type: 0 for cache_type in CacheType}
+        self.stats = {
+            cache_type: {'hits': 0, 'misses': 0, 'evictions': 0}
+            for cache_type in CacheType
+        }
+
+    def enabled(self, cache_type):
+        return self.max_bytes[cache_type] > 0 and self.ttls[cache_type] > timedelta(0)
+
+    def get(self, key, cache_type):
+        """Return (hit, value) for ``key``, dropping it if it has expired"""
+        entries = self._entries[cache_type]
+        entry = entries.get(key)
+        if entry is None:
+            self._count(cache_type, 'misses')
+            return False, None
+
+        value, size, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key, cache_type)
+            self._count(cache_type, 'misses')
+            return False, None
+
+        entries.move_to_end(key)
+        self._count(cache_type, 'hits')
+        return True, value
+
+    def _count(self, cache_type, outcome):
+        self.stats[cache_type][outcome] += 1
+        CACHE_LOOKUPS.labels("l1", cache_type.value, "hit" if outcome == 'hits' else "miss").inc()
+
+    def set(self, key, value, cache_type, size, max_age=None):
+        """
+        Store a decoded value, sized by its uncompressed encoded payload;
+        ``max_age`` caps the tier TTL in seconds
+        """
+        if not self.enabled(cache_type) or size > self.max_bytes[cache_type]:
+            return
+
+        ttl = self.ttls[cache_type].total_seconds()
+        if max_age is not None:
+            ttl = min(ttl, max_age)
+        if ttl <= 0:
+            return
+
+        self._remove(key, cache_type)
+        entries = self._entries[cache_type]
+        entries[key] = (value, size, time.monotonic() + ttl)
+        self._sizes[cache_type] += size
+
+        while self._sizes[cache_type] > self.max_bytes[cache_type]:
+            oldest_key = next(iter(entries))
+            self._remove(oldest_key, cache_type)
+            self.stats[cache_type]['evictions'] += 1
+
+    def delete(self, key, cache_type):
+        self._remove(key, cache_type)
+
+    def _remove(self, key, cache_type):
+        entry = self._entries[cache_type].pop(key, None)
+        if entry is not None:
+            self._sizes[cache_type] -= entry[1]
+
+    def usage(self):
+        return {
+            cache_type.value: {
+                'entries': len(self._entries[cache_type]),
+                'bytes': self._sizes[cache_type],
+                'max_bytes': self.max_bytes[cache_type]
+            }
+            for cache_type in CacheType
+        }
+
+local_cache = LocalCache(L1_CACHE_TTL, L1_CACHE_MAX_BYTES)
+
+# Redis (L2) tier counters; evictions are reported by Redis itself.
+# ``migrated`` counts legacy JSON entries rewritten in the packed format.
+redis_stats = {'hits': 0, 'misses': 0, 'migrated': 0}
+
+async def get_cache_stats():
+    """Hit/miss/eviction counters for each cache tier"""
+    l2 = dict(redis_stats)
+    try:
+        info = await redis_client.info("stats")
+        l2['evictions'] = info.get('evicted_keys', 0)
+    except redis.RedisError:
+        l2['evictions'] = None
+
+    usage = local_cache.usage()
+    return {
+        'l1': {
+            cache_type.value: dict(local_cache.stats[cache_type], **usage[cache_type.value])
+            for cache_type in CacheType
+        },
+        'l2': l2
+    }
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How long a Battle.net response stays fresh and who may share it"""
+    cache_type: CacheType
+    ttl: timedelta
+    stale: timedelta
+    shared: bool = True
+
+    @property
+    def retention(self):
+        """How long Redis keeps the entry: fresh for ``ttl``, then servable while stale"""
+        return self.ttl + self.stale
+
+    def to_dict(self):
+        return {
+            "cache_type": self.cache_type.value,
+            "ttl_seconds": int(self.ttl.total_seconds()),
+            "stale_seconds": int(self.stale.total_seconds()),
+            "shared": self.shared
+        }
+
+@dataclass(frozen=True)
+class CachePolicyRule:
+    """Endpoint pattern, optionally limited to one namespace and/or region"""
+    pattern: str
+    policy: CachePolicy
+    namespace: Optional[str] = None
+    region: Optional[str] = None
+
+    def matches(self, path, namespace, region):
+        if self.namespace and self.namespace != namespace:
+            return False
+        if self.region and self.region != region:
+            return False
+        return re.search(self.pattern, path) is not None
+
+def _default_policy(cache_type, shared=True):
+    return CachePolicy(cache_type, CACHE_EXPIRY[cache_type], CACHE_MAX_STALENESS[cache_type], shared)
+
+# Used when no rule matches, by namespace
+DEFAULT_CACHE_POLICIES = {
+    "profile": _default_policy(CacheType.PROFILE),
+    "dynamic": _default_policy(CacheType.DYNAMIC),
+    "static": _default_policy(CacheType.STATIC)
+}
+
+# Used when neither a rule nor the namespace says what the response depends
+# on, so it is never handed to another user
+UNMATCHED_CACHE_POLICY = _default_policy(CacheType.PROFILE, shared=False)
+
+# First matching rule wins
+CACHE_POLICY_RULES = [
+    # Account data depends on the token that requested it
+    CachePolicyRule(r"^/profile/user/", _default_policy(CacheType.PROFILE, shared=False)),
+    # Media documents, including item media fetched by absolute URL without a namespace
+    CachePolicyRule(r"/data/wow/media/", _default_policy(CacheType.STATIC)),
+]
+
+def parse_namespace(namespace):
+    """Return (namespace, region) for a Namespace enum or a 'static-eu' style string"""
+    namespace = getattr(namespace, 'value', namespace)
+    if not namespace:
+        return None, None
+    kind, _, region = namespace.partition("-")
+    return kind, region or None
+
+def cache_endpoint(endpoint):
+    """An endpoint without its scheme and host, so absolute URLs are keyed like paths"""
+    parts = urlsplit(endpoint)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+def resolve_cache_policy(endpoint, namespace=None, region=None):
+    """Look up the effective cache policy for an endpoint path or absolute URL"""
+    namespace, namespace_region = parse_namespace(namespace)
+    region = region or namespace_region
+    path = urlsplit(endpoint).path
+    for rule in CACHE_POLICY_RULES:
+        if rule.matches(path, namespace, region):
+            return rule.policy
+    return DEFAULT_CACHE_POLICIES.get(namespace, UNMATCHED_CACHE_POLICY)
+
+def create_cache_key(endpoint, access_token=None, region_locale=None, namespace=None, params=None, shared=True, fields=None):
+    """
+    Key a Battle.net response by what the data depends on rather than who asked.
+
+    Shared entries are reused by every user of a region and locale; the rest
+    are partitioned by a hash of the access token. Projected responses are
+    keyed by the fingerprint of their projection, whole ones are not.
+    Absolute URLs are keyed by their path and query.
+    """
+    namespace = parse_namespace(namespace)[0] or "none"
+    # None means the RegionLocale() defaults of make_request
+    region = region_locale.region.name.lower() if region_locale else "us"
+    locale = region_locale.locale.value if region_locale else "en_US"
+
+    key = f"bnet:{namespace}:{region}:{locale}:{cache_endpoint(endpoint)}"
+    if access_token and not shared:
+        key += f":user={hashlib.sha256(access_token.encode()).hexdigest()[:16]}"
+    if fields:
+        key += f":fields={fields}"
+    if params:
+        key += f":{json.dumps(params, sort_keys=True, default=str)}"
+    return key
+
+CACHE_KEY_PATTERN = re.compile(
+    r"^bnet:(?P<namespace>[^:]+):(?P<region>[^:]+):(?P<locale>[^:]+):"
+    r"(?P<endpoint>.*?)(?::user=(?P<user>[0-9a-f]+))?(?::fields=(?P<fields>[0-9a-f]+))?"
+    r"(?::(?P<params>\{.*\}))?$"
+)
+
+def parse_cache_key(cache_key):
+    """Split a key built by create_cache_key into its parts, or None if it is not one"""
+    match = CACHE_KEY_PATTERN.match(cache_key)
+    if not match:
+        return None
+    parts = match.groupdict()
+    if parts["namespace"] == "none":
+        parts["namespace"] = None
+    return parts
+
+# Entries are added to a tag set per guild, character and realm they belong
+# to, so everything cached about one of them can be dropped together. Tag
+# sets are sorted sets scored by when each entry expires
+CACHE_TAG_PREFIX = "cachetags:"
+
+# Stores KEYS[1] as ARGV[1] for ARGV[2] seconds, or until evicted when 0, and
+# registers it in the tag sets KEYS[2..]. Members that have already expired
+# are dropped from each set, and a set expires with the last entry in it,
+# so a busy realm's set only holds entries that still exist.
+STORE_ENTRY_SCRIPT = """
+local now = tonumber(redis.call('TIME')[1])
+local ttl = tonumber(ARGV[2])
+local expires_at = '+inf'
+if ttl > 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+    expires_at = now + ttl
+else
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+
+for i = 2, #KEYS do
+    redis.call('ZADD', KEYS[i], expires_at, KEYS[1])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now)
+    local last = redis.call('ZRANGE', KEYS[i], -1, -1, 'WITHSCORES')
+    if last[2] == 'inf' then
+        redis.call('PERSIST', KEYS[i])
+    else
+        redis.call('EXPIREAT', KEYS[i], last[2])
+    end
+end
+return 1
+"""
+store_entry_script = binary_redis_client.register_script(STORE_ENTRY_SCRIPT)
+
+GUILD_ENDPOINT = re.compile(r"^/data/wow/guild/(?P<realm>[^/]+)/(?P<guild>[^/?]+)")
+CHARACTER_ENDPOINT = re.compile(r"^/profile/wow/character/(?P<realm>[^/]+)/(?P<character>[^/?]+)")
+
+def guild_tag(region, realm, guild):
+    return f"guild:{region}:{realm}:{guild}".lower()
+
+def character_tag(region, realm, character):
+    return f"character:{region}:{realm}:{character}".lower()
+
+def realm_tag(region, realm):
+    return f"realm:{region}:{realm}".lower()
+
+def cache_tags(cache_key):
+    """Tags of the guild, character and realm a cached response belongs to"""
+    parts = parse_cache_key(cache_key)
+    if not parts:
+        return []
+    region, endpoint = parts["region"], parts["endpoint"]
+
+    match = GUILD_ENDPOINT.match(endpoint)
+    if match:
+        return [guild_tag(region, match["realm"], match["guild"]), realm_tag(region, match["realm"])]
+    match = CHARACTER_ENDPOINT.match(endpoint)
+    if match:
+        return [character_tag(region, match["realm"], match["character"]), realm_tag(region, match["realm"])]
+    return []
+
+async def store_entry(cache_key, serialized, ttl=None):
+    """Write a packed entry to Redis and register it under its tags"""
+    tag_keys = [f"{CACHE_TAG_PREFIX}{tag}" for tag in cache_tags(cache_key)]
+    await store_entry_script(keys=[cache_key, *tag_keys], args=[serialized, ttl or 0])
+
+async def tag_members(tag):
+    """Cache keys currently registered under ``tag`` whose entries have not expired"""
+    return await redis_client.zrangebyscore(f"{CACHE_TAG_PREFIX}{tag}", f"({time.time()}", "+inf")
+
+async def invalidate_tag(tag):
+    """
+    Delete every cache entry registered under ``tag`` and return how many there were.
+
+    Only this process's L1 tier is cleared; the profile data guild and
+    character tags cover is never held in L1, and other entries age out of
+    it within L1_CACHE_TTL.
+    """
+    tag_key = f"{CACHE_TAG_PREFIX}{tag}"
+    cache_keys = await redis_client.zrange(tag_key, 0, -1)
+    await redis_client.delete(tag_key, *cache_keys)
+    for cache_key in cache_keys:
+        for cache_type in CacheType:
+            local_cache.delete(cache_key, cache_type)
+    return len(cache_keys)
+
+# Set while a caller wants cached responses refetched rather than served
+_force_refresh = ContextVar("force_refresh", default=False)
+
+@contextmanager
+def forced_refresh():
+    """Make cached calls inside the block go upstream and overwrite their entries"""
+    token = _force_refresh.set(True)
+    try:
+        yield
+    finally:
+        _force_refresh.reset(token)
+
+# Entries read ahead by read_entries() for the cached calls of a batch
+_prefetched = ContextVar("prefetched", default=None)
+
+@contextmanager
+def prefetched_entries(entries):
+    """Let cached calls inside the block use ``entries`` instead of reading their key from Redis"""
+    token = _prefetched.set(entries)
+    try:
+        yield
+    finally:
+        _prefetched.reset(token)
 
 def create_simc_cache_key(input_text):
     """Create a hash key for SimC input text"""
     return f"simc:{hashlib.md5(input_text.encode()).hexdigest()}"
 
+def retention_seconds(policy):
+    """Redis TTL for an entry, or None to keep it until evicted"""
+    seconds = int(policy.retention.total_seconds())
+    return seconds if seconds > 0 else None
+
+# Upstream calls currently in flight, keyed by cache key
+_inflight = {}
+
+# Background stale-while-revalidate refreshes, keyed by cache key
+_refreshing = {}
+
+def single_flight(cache_key, factory):
+    """Share one running call to ``factory`` between all concurrent callers of ``cache_key``"""
+    task = _inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+    # Shield so one cancelled caller does not cancel the fetch for everyone else
+    return asyncio.shield(task)
+
 def cache_api_response(func):
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        # Extract namespace from kwargs to determine cache type
-        namespace = kwargs.get('namespace', 'profile-us')
-        cache_type = determine_cache_type(namespace)
-        cache_expiry = CACHE_EXPIRY[cache_type]
-        
-        cache_key = create_cache_key(func.__name__, args, kwargs)
-        
+    """
+    Cache a coroutine shaped like make_request(endpoint, access_token, region_locale, namespace, raw, **kwargs).
+
+    Responses are trimmed to their endpoint's projection before they are
+    cached unless the call passes raw=True.
+    """
+    signature = inspect.signature(func)
+
+    async def fetch(projection, args, kwargs):
+        data = await func(*args, **kwargs)
+        if projection and data is not None:
+            return projection.apply(data)
+        return data
+
+    async def cached_call(cache_key, policy, projection, args, kwargs):
+        cache_type = policy.cache_type
+        cache_expiry = policy.ttl
         try:
-            cached_data = redis_client.get(cache_key)
+            prefetched = _prefetched.get()
+            if prefetched is not None and cache_key in prefetched:
+                # Popped, so a later call in the block sees what it stored
+                cached_data = prefetched.pop(cache_key)
+            else:
+                cached_data = await binary_redis_client.get(cache_key)
+            cached = None
             if cached_data:
-                cached_dict = json.loads(cached_data)
-                cached_time = datetime.fromisoformat(cached_dict['timestamp'])
-                
-                if datetime.now() - cached_time < cache_expiry:
-                    return cached_dict['data']
+                try:
+                    cached = entry_codec.decode(cached_data)
+                except CodecError as e:
+                    log.warning(f"Ignoring unreadable cache entry {cache_key}: {str(e)}")
+
+            if cached:
+                redis_stats['hits'] += 1
+                data, stored_at, legacy, size = cached
+                age = timedelta(seconds=max(0.0, time.time() - stored_at))
+                if legacy:
+                    try:
+                        await migrate(cache_key, policy, data, stored_at, age)
+                    except redis.RedisError as e:
+                        log.warning(f"Could not migrate cache entry {cache_key}: {str(e)}")
+
+                if age < cache_expiry:
+                    CACHE_LOOKUPS.labels("l2", cache_type.value, "hit").inc()
+                    local_cache.set(
+                        cache_key, data, cache_type, size,
+                        max_age=(cache_expiry - age).total_seconds()
+                    )
+                    return data
                 
+                if STALE_WHILE_REVALIDATE and age < policy.retention:
+                    CACHE_LOOKUPS.labels("l2", cache_type.value, "stale").inc()
+                    schedule_refresh(cache_key, policy, projection, args, kwargs)
+                    return data
+
+                CACHE_LOOKUPS.labels("l2", cache_type.value, "expired").inc()
                 try:
-                    new_data = await func(*args, **kwargs)
+                    new_data = await fetch(projection, args, kwargs)
                     if new_data is not None:
-                        cache_dict = {
-                            'data': new_data,
-                            'timestamp': datetime.now().isoformat()
-                        }
-                        redis_client.set(cache_key, json.dumps(cache_dict))
+                        await try_store(cache_key, policy, new_data)
                         return new_data
-                    return cached_dict['data']
+                    return data
                 except Exception:
-                    return cached_dict['data']
+                    return data
             
-            data = await func(*args, **kwargs)
+            redis_stats['misses'] += 1
+            CACHE_LOOKUPS.labels("l2", cache_type.value, "miss").inc()
+            data = await fetch(projection, args, kwargs)
             if data is not None:
-                cache_dict = {
-                    'data': data,
-                    'timestamp': datetime.now().isoformat()
-                }
-                redis_client.set(cache_key, json.dumps(cache_dict))
+                await try_store(cache_key, policy, data)
             return data
             
         except redis.RedisError:
-            return await func(*args, **kwargs)
+            # Only reads get here; failed writes are logged by try_store, so
+            # a fetched response is never fetched again
+            CACHE_LOOKUPS.labels("l2", cache_type.value, "error").inc()
+            return await fetch(projection, args, kwargs)
+
+    async def store(cache_key, policy, data):
+        serialized, size = entry_codec.encode(data)
+        local_cache.set(cache_key, data, policy.cache_type, size)
+        await store_entry(cache_key, serialized, retention_seconds(policy))
+
+    async def try_store(cache_key, policy, data):
+        """Store an entry, logging rather than raising when Redis refuses the write"""
+        try:
+            await store(cache_key, policy, data)
+        except redis.RedisError as e:
+            log.warning(f"Could not store cache entry {cache_key}: {str(e)}")
+
+    async def force_refresh(cache_key, policy, projection, args, kwargs):
+        """Refetch and overwrite an entry, leaving the old one in place if the fetch fails"""
+        data = await fetch(projection, args, kwargs)
+        if data is not None:
+            await try_store(cache_key, policy, data)
+        return data
+
+    async def migrate(cache_key, policy, data, stored_at, age):
+        """Rewrite a legacy JSON entry in the packed format, keeping its age"""
+        remaining = (policy.retention - age).total_seconds()
+        if remaining <= 0:
+            await binary_redis_client.delete(cache_key)
+            return
+        serialized, _ = entry_codec.encode(data, stored_at=stored_at)
+        await store_entry(cache_key, serialized, max(1, int(remaining)))
+        redis_stats['migrated'] += 1
+
+    def schedule_refresh(cache_key, policy, projection, args, kwargs):
+        if cache_key in _refreshing:
+            return
+        task = asyncio.ensure_future(refresh(cache_key, policy, projection, args, kwargs))
+        _refreshing[cache_key] = task
+        task.add_done_callback(lambda _: _refreshing.pop(cache_key, None))
+
+    async def refresh(cache_key, policy, projection, args, kwargs):
+        lock_key = f"refresh-lock:{cache_key}"
+        try:
+            if not await redis_client.set(lock_key, 1, nx=True, ex=REFRESH_LOCK_SECONDS):
+                return
+        except redis.RedisError as e:
+            log.warning(f"Background refresh failed for {cache_key}: {str(e)}")
+            return
+        try:
+            if 'priority' in signature.parameters:
+                # Nobody is waiting on this call, so it only gets leftover quota
+                from .ratelimit import Priority
+                kwargs = {**kwargs, 'priority': Priority.BACKGROUND}
+            data = await fetch(projection, args, kwargs)
+            if data is not None:
+                await store(cache_key, policy, data)
+        except Exception as e:
+            log.warning(f"Background refresh failed for {cache_key}: {str(e)}")
+        finally:
+            # A failed refresh must not keep other instances from retrying
+            try:
+                await redis_client.delete(lock_key)
+            except redis.RedisError:
+                pass
+
+    def resolve(args, kwargs):
+        """Return (cache key, policy, projection) for a call"""
+        arguments = signature.bind(*args, **kwargs).arguments
+
+        region_locale = arguments.get('region_locale')
+        policy = resolve_cache_policy(
+            arguments['endpoint'],
+            namespace=arguments.get('namespace'),
+            region=region_locale.region.name.lower() if region_locale else None
+        )
+        projection = None if arguments.get('raw') else resolve_projection(arguments['endpoint'])
+        
+        cache_key = create_cache_key(
+            arguments['endpoint'],
+            access_token=arguments.get('access_token'),
+            region_locale=region_locale,
+            namespace=arguments.get('namespace'),
+            params=arguments.get('kwargs'),
+            shared=policy.shared,
+            fields=projection.fingerprint if projection else None
+        )
+        return cache_key, policy, projection
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        cache_key, policy, projection = resolve(args, kwargs)
+
+        if _force_refresh.get():
+            # Concurrent forced refreshes of one key share a single upstream call
+            return await single_flight(
+                f"refresh:{cache_key}",
+                lambda: force_refresh(cache_key, policy, projection, args, kwargs)
+            )
+
+        if local_cache.enabled(policy.cache_type):
+            hit, data = local_cache.get(cache_key, policy.cache_type)
+            if hit:
+                return data
+        
+        # Concurrent identical requests wait on the same lookup and upstream fetch
+        return await single_flight(
+            cache_key,
+            lambda: cached_call(cache_key, policy, projection, args, kwargs)
+        )
     
+    def cache_key(*args, **kwargs):
+        """The key a call is cached under, for reading entries ahead with read_entries()"""
+        return resolve(args, kwargs)[0]
+
+    wrapper.cache_key = cache_key
     return wrapper
 
 def cache_simc_result(func):
@@ -104,7 +703,7 @@ def cache_simc_result(func):
         
         try:
             # Check cache first
-            cached_result = redis_client.get(cache_key)
+            cached_result = await redis_client.get(cache_key)
             if cached_result:
                 if os.path.exists(cached_result):
                     return cached_result
@@ -118,7 +717,7 @@ def cache_simc_result(func):
             
             # Cache the successful simulation
             if output_file and os.path.exists(output_file):
-                redis_client.setex(
+                await redis_client.setex(
                     cache_key,
                     int(CACHE_EXPIRY[CacheType.SIMC].total_seconds()),
                     output_file
@@ -0,0 +1,258 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+import dotenv
+from fastapi import Request
+from slugify import slugify
+
+from .bliz import BlizzardAPIClient, RegionLocale, Region, Locale
+from .ratelimit import Priority
+from .log import log
+
+dotenv.load_dotenv()
+
+CATALOGUE_REFRESH_INTERVAL = int(os.getenv("CATALOGUE_REFRESH_INTERVAL", "3600"))
+
+# Warm-start snapshots; bump the version whenever the snapshot layout changes
+CATALOGUE_SNAPSHOT_DIR = os.getenv("CATALOGUE_SNAPSHOT_DIR", "snapshots")
+CATALOGUE_SNAPSHOT_VERSION = 1
+
+
+def slugify_realm(realm: str) -> str:
+    return slugify(realm, replacements=[["'", ""]])
+
+
+@dataclass(frozen=True)
+class GameDataCatalogue:
+    """Read-only id lookups for the game data every guild and roster page needs"""
+    region_locale: RegionLocale
+    races: Mapping[int, str]
+    classes: Mapping[int, str]
+    class_media: Mapping[int, dict]
+    realms: Mapping[int, str]
+    realm_slugs: Mapping[int, str]
+    loaded_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_indexes(cls, region_locale, race_index, class_index, realm_index, class_media):
+        realms = {realm["id"]: realm["name"] for realm in realm_index["realms"]}
+        return cls(
+            region_locale=region_locale,
+            races=MappingProxyType({race["id"]: race["name"] for race in race_index["races"]}),
+            classes=MappingProxyType({
+                playable_class["id"]: playable_class["name"]
+                for playable_class in class_index["classes"]
+            }),
+            class_media=MappingProxyType(dict(class_media)),
+            realms=MappingProxyType(realms),
+            realm_slugs=MappingProxyType({
+                realm_id: slugify_realm(name) for realm_id, name in realms.items()
+            })
+        )
+
+    def to_snapshot(self) -> dict:
+        return {
+            "version": CATALOGUE_SNAPSHOT_VERSION,
+            "region": self.region_locale.region.name,
+            "locale": self.region_locale.locale.value,
+            "loaded_at": self.loaded_at,
+            "races": dict(self.races),
+            "classes": dict(self.classes),
+            "class_media": dict(self.class_media),
+            "realms": dict(self.realms),
+            "realm_slugs": dict(self.realm_slugs)
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict) -> "GameDataCatalogue":
+        """Rebuild a catalogue from to_snapshot() output; JSON turned the ids into strings"""
+        def by_id(mapping):
+            return MappingProxyType({int(key): value for key, value in mapping.items()})
+
+        return cls(
+            region_locale=RegionLocale(Region[snapshot["region"]], Locale(snapshot["locale"])),
+            races=by_id(snapshot["races"]),
+            classes=by_id(snapshot["classes"]),
+            class_media=by_id(snapshot["class_media"]),
+            realms=by_id(snapshot["realms"]),
+            realm_slugs=by_id(snapshot["realm_slugs"]),
+            loaded_at=snapshot["loaded_at"]
+        )
+
+    def race_name(self, race_id: int) -> Optional[str]:
+        return self.races.get(race_id)
+
+    def class_name(self, class_id: int) -> Optional[str]:
+        return self.classes.get(class_id)
+
+    def class_media_for(self, class_id: int) -> Optional[dict]:
+        return self.class_media.get(class_id)
+
+    def realm_slug(self, realm_id: int) -> Optional[str]:
+        return self.realm_slugs.get(realm_id)
+
+
+async def load_catalogue(
+    bliz: BlizzardAPIClient,
+    region_locale: RegionLocale,
+    access_token: Optional[str] = None,
+    priority: Priority = Priority.INTERACTIVE
+) -> Optional[GameDataCatalogue]:
+    """
+    Fetch the indexes and class media behind a catalogue, or None if any are missing.
+
+    ``priority`` is the lane for the indexes; the class media fan-out runs on
+    the bulk lane, or on the background lane with everything else when
+    ``priority`` is BACKGROUND.
+    """
+    race_index, class_index, realm_index = await asyncio.gather(
+        bliz.get_playable_race_index(access_token, region_locale=region_locale, priority=priority),
+        bliz.get_playable_class_index(access_token, region_locale=region_locale, priority=priority),
+        bliz.get_realm_index(access_token, region_locale=region_locale, priority=priority)
+    )
+    if not (race_index and class_index and realm_index):
+        return None
+
+    class_ids = [playable_class["id"] for playable_class in class_index["classes"]]
+    media_priority = Priority.BACKGROUND if priority == Priority.BACKGROUND else Priority.BULK
+    class_media = await bliz.get_class_media_many(
+        access_token, class_ids, region_locale=region_locale, priority=media_priority
+    )
+    # A failed media call would otherwise be frozen into the catalogue and its snapshot
+    missing = [class_id for class_id in class_ids if not class_media.get(class_id)]
+    if missing:
+        log.warning(f"Class media for {region_locale} missing for classes {missing}")
+        return None
+    return GameDataCatalogue.from_indexes(region_locale, race_index, class_index, realm_index, class_media)
+
+
+class CatalogueStore:
+    """
+    Holds one GameDataCatalogue per region and locale.
+
+    The default region is loaded at startup and every loaded catalogue is
+    swapped for a fresh one in the background, so routes never rebuild the
+    lookups themselves. Each catalogue is also written to a versioned
+    snapshot file, which the next start serves from before any upstream call.
+    """
+
+    def __init__(self, bliz: BlizzardAPIClient, refresh_interval: int = CATALOGUE_REFRESH_INTERVAL):
+        self.bliz = bliz
+        self.refresh_interval = refresh_interval
+        self._catalogues: Dict[RegionLocale, GameDataCatalogue] = {}
+        self._locks: Dict[RegionLocale, asyncio.Lock] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background = set()
+
+    async def get(self, region_locale: RegionLocale, access_token: Optional[str] = None) -> Optional[GameDataCatalogue]:
+        """Return the catalogue for a region, loading it on first use"""
+        catalogue = self._catalogues.get(region_locale)
+        if catalogue:
+            return catalogue
+
+        lock = self._locks.setdefault(region_locale, asyncio.Lock())
+        async with lock:
+            catalogue = self._catalogues.get(region_locale)
+            if catalogue is None:
+                catalogue = await load_catalogue(self.bliz, region_locale, access_token)
+                if catalogue:
+                    await self._install(catalogue)
+            return catalogue
+
+    async def start(self, region_locales=(RegionLocale(),)):
+        for region_locale in region_locales:
+            # A snapshot serves immediately and is refreshed once the app is up
+            catalogue = self._load_snapshot(region_locale)
+            if catalogue:
+                self._catalogues[region_locale] = catalogue
+                task = asyncio.create_task(self._refresh(region_locale))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+                continue
+
+            # On failure routes load it on demand with the user's token instead
+            try:
+                if not await self.get(region_locale):
+                    log.warning(f"Game data for {region_locale} unavailable at startup")
+            except Exception as e:
+                log.warning(f"Could not preload game data for {region_locale}: {str(e)}")
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        for task in self._background:
+            task.cancel()
+
+    async def _install(self, catalogue: GameDataCatalogue):
+        self._catalogues[catalogue.region_locale] = catalogue
+        try:
+            await asyncio.to_thread(self._save_snapshot, catalogue)
+        except OSError as e:
+            log.warning(f"Could not write game data snapshot: {str(e)}")
+
+    async def _refresh(self, region_locale: RegionLocale):
+        try:
+            # Nobody is waiting on a refresh, so it only gets leftover quota
+            catalogue = await load_catalogue(self.bliz, region_locale, priority=Priority.BACKGROUND)
+            if catalogue:
+                await self._install(catalogue)
+        except Exception as e:
+            log.warning(f"Could not refresh game data for {region_locale}: {str(e)}")
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            for region_locale in list(self._catalogues):
+                await self._refresh(region_locale)
+
+    @staticmethod
+    def _snapshot_path(region_locale: RegionLocale) -> str:
+        return os.path.join(
+            CATALOGUE_SNAPSHOT_DIR,
+            f"catalogue-{region_locale.region.name.lower()}-{region_locale.locale.value}.json"
+        )
+
+    def _save_snapshot(self, catalogue: GameDataCatalogue):
+        """Write atomically so a crash never leaves a truncated snapshot behind"""
+        os.makedirs(CATALOGUE_SNAPSHOT_DIR, exist_ok=True)
+        path = self._snapshot_path(catalogue.region_locale)
+        # Every worker refreshes at startup, so each writes its own temp file
+        with tempfile.NamedTemporaryFile(
+            "w", dir=CATALOGUE_SNAPSHOT_DIR, prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False
+        ) as f:
+            temp_path = f.name
+            try:
+                json.dump(catalogue.to_snapshot(), f)
+            except BaseException:
+                f.close()
+                os.remove(temp_path)
+                raise
+        os.replace(temp_path, path)
+
+    def _load_snapshot(self, region_locale: RegionLocale) -> Optional[GameDataCatalogue]:
+        path = self._snapshot_path(region_locale)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") != CATALOGUE_SNAPSHOT_VERSION:
+                return None
+            return GameDataCatalogue.from_snapshot(snapshot)
+        except (OSError, ValueError, KeyError) as e:
+            log.warning(f"Ignoring unreadable game data snapshot {path}: {str(e)}")
+            return None
+
+
+async def get_catalogue_store(request: Request) -> CatalogueStore:
+    """
+    Dependency injection function for the CatalogueStore created at startup.
+    """
+    return request.app.state.catalogue
@@ -0,0 +1,239 @@
+import json
+import os
+from abc import ABC, abstractmethod
+import struct
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import dotenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+dotenv.load_dotenv()
+
+# "auto" picks the fastest installed codec; json always works
+CACHE_CODEC = os.getenv("CACHE_CODEC", "auto").lower()
+# "auto" uses zstd when installed and zlib otherwise; "none" disables it
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "auto").lower()
+# Small payloads are cheaper to store as-is than to compress
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+
+# Header: magic, format version, codec id, compression id, stored-at in ms.
+# The magic byte can never start a legacy JSON entry, which always begins
+# with '{'.
+HEADER = struct.Struct(">BBBBq")
+MAGIC = 0xB7
+FORMAT_VERSION = 1
+
+
+class CodecError(ValueError):
+    """A cache entry could not be decoded"""
+
+
+class CacheCodec(ABC):
+    """Serializes cached Battle.net payloads to bytes"""
+    id = 0
+    name = ""
+
+    @abstractmethod
+    def encode(self, data: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> Any:
+        ...
+
+
+class JsonCodec(CacheCodec):
+    id = 1
+    name = "json"
+
+    def encode(self, data):
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    def decode(self, payload):
+        return json.loads(payload)
+
+
+class OrjsonCodec(CacheCodec):
+    id = 2
+    name = "orjson"
+
+    def encode(self, data):
+        return orjson.dumps(data)
+
+    def decode(self, payload):
+        return orjson.loads(payload)
+
+
+class MsgpackCodec(CacheCodec):
+    id = 3
+    name = "msgpack"
+
+    def encode(self, data):
+        return msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, payload):
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+class Compressor:
+    id = 0
+    name = "none"
+
+    def compress(self, payload: bytes) -> bytes:
+        return payload
+
+    def decompress(self, payload: bytes) -> bytes:
+        return payload
+
+
+class ZlibCompressor(Compressor):
+    id = 1
+    name = "zlib"
+
+    def compress(self, payload):
+        return zlib.compress(payload, 6)
+
+    def decompress(self, payload):
+        return zlib.decompress(payload)
+
+
+class ZstdCompressor(Compressor):
+    id = 2
+    name = "zstd"
+
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, payload):
+        return self._compressor.compress(payload)
+
+    def decompress(self, payload):
+        return self._decompressor.decompress(payload)
+
+
+def available_codecs() -> Dict[str, CacheCodec]:
+    """Codecs usable in this environment, by name"""
+    codecs = {"json": JsonCodec()}
+    if orjson is not None:
+        codecs["orjson"] = OrjsonCodec()
+    if msgpack is not None:
+        codecs["msgpack"] = MsgpackCodec()
+    return codecs
+
+
+def available_compressors() -> Dict[str, Compressor]:
+    """Compressors usable in this environment, by name"""
+    compressors = {"none": Compressor(), "zlib": ZlibCompressor()}
+    if zstandard is not None:
+        compressors["zstd"] = ZstdCompressor()
+    return compressors
+
+
+def _select(options, name, preference):
+    if name == "auto":
+        return next(options[choice] for choice in preference if choice in options)
+    if name not in options:
+        raise ValueError(f"Cache codec option '{name}' is unknown or not installed")
+    return options[name]
+
+
+class EntryCodec:
+    """
+    Packs a payload and the time it was stored into one Redis value.
+
+    Entries carry the id of the codec and compressor that wrote them, so
+    processes configured differently can still read each other's entries.
+    Legacy ``{"data": ..., "timestamp": isoformat}`` JSON entries are
+    decoded too.
+    """
+
+    def __init__(
+        self,
+        codec: CacheCodec,
+        compressor: Compressor,
+        compress_min_bytes: int = CACHE_COMPRESS_MIN_BYTES
+    ):
+        self.codec = codec
+        self.compressor = compressor
+        self.compress_min_bytes = compress_min_bytes
+        self._codecs = {c.id: c for c in available_codecs().values()}
+        self._compressors = {c.id: c for c in available_compressors().values()}
+
+    def encode(self, data: Any, stored_at: Optional[float] = None) -> Tuple[bytes, int]:
+        """Return (entry, uncompressed payload length); the length is what sizes in-process copies"""
+        payload = self.codec.encode(data)
+        size = len(payload)
+        compressor = self.compressor
+        if compressor.id and len(payload) >= self.compress_min_bytes:
+            payload = compressor.compress(payload)
+        else:
+            compressor = self._compressors[0]
+
+        stored_at = time.time() if stored_at is None else stored_at
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.codec.id, compressor.id, int(stored_at * 1000))
+        return header + payload, size
+
+    def decode(self, raw: bytes) -> Tuple[Any, float, bool, int]:
+        """
+        Return (data, stored-at epoch seconds, whether the entry used the
+        legacy format, uncompressed payload length)
+        """
+        if isinstance(raw, str):
+            raw = raw.encode()
+        if not raw or raw[0] != MAGIC:
+            return self._decode_legacy(raw) + (True, len(raw))
+
+        if len(raw) < HEADER.size:
+            raise CodecError("Truncated cache entry header")
+        _, version, codec_id, compressor_id, stored_at_ms = HEADER.unpack_from(raw)
+        if version != FORMAT_VERSION:
+            raise CodecError(f"Unsupported cache entry version {version}")
+
+        codec = self._codecs.get(codec_id)
+        compressor = self._compressors.get(compressor_id)
+        if codec is None or compressor is None:
+            raise CodecError(f"Cache entry needs codec {codec_id}/{compressor_id}, which is not installed")
+
+        try:
+            payload = compressor.decompress(raw[HEADER.size:])
+            data = codec.decode(payload)
+        except Exception as e:
+            raise CodecError(str(e)) from e
+        return data, stored_at_ms / 1000, False, len(payload)
+
+    @staticmethod
+    def _decode_legacy(raw: bytes) -> Tuple[Any, float]:
+        try:
+            entry = json.loads(raw)
+            stored_at = datetime.fromisoformat(entry["timestamp"]).timestamp()
+            return entry["data"], stored_at
+        except (ValueError, KeyError, TypeError) as e:
+            raise CodecError(f"Unreadable legacy cache entry: {str(e)}") from e
+
+
+def create_entry_codec(codec: str = CACHE_CODEC, compression: str = CACHE_COMPRESSION) -> EntryCodec:
+    return EntryCodec(
+        _select(available_codecs(), codec, ("orjson", "msgpack", "json")),
+        _select(available_compressors(), compression, ("zstd", "zlib"))
+    )
+
+
+entry_codec = create_entry_codec()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import aiohttp
+import dotenv
+
+from .metrics import UPSTREAM_LATENCY, endpoint_template
+
+dotenv.load_dotenv()
+
+# Connection pool tuning, per region
+POOL_SIZE = int(os.getenv("BNET_POOL_SIZE", "100"))
+POOL_SIZE_PER_HOST = int(os.getenv("BNET_POOL_SIZE_PER_HOST", "50"))
+KEEPALIVE_TIMEOUT = float(os.getenv("BNET_KEEPALIVE_TIMEOUT", "30"))
+DNS_CACHE_TTL = int(os.getenv("BNET_DNS_CACHE_TTL", "300"))
+CONNECT_TIMEOUT = float(os.getenv("BNET_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("BNET_READ_TIMEOUT", "10"))
+
+
+class _Pool:
+    """One region's session plus counters for the requests running on it"""
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+
+
+class ConnectionManager:
+    """
+    Keep-alive aiohttp sessions for Battle.net, one pool per region.
+
+    Each region gets its own connector so a slow region cannot exhaust the
+    sockets another region needs. The connector caps in-flight requests per
+    host, caches DNS and applies connect and read timeouts to every request.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        pool_size_per_host: int = POOL_SIZE_PER_HOST,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = DNS_CACHE_TTL,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT
+    ):
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._pools: Dict[str, _Pool] = {}
+
+    def timeout(self, total: Optional[float] = None) -> aiohttp.ClientTimeout:
+        """Client timeout with the pool's connect/read limits and an optional overall deadline"""
+        return aiohttp.ClientTimeout(
+            total=total,
+            connect=self.connect_timeout,
+            sock_read=self.read_timeout
+        )
+
+    def _pool(self, region: str) -> _Pool:
+        pool = self._pools.get(region)
+        if pool is None or pool.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=self.timeout())
+            pool = _Pool(session)
+            self._pools[region] = pool
+        return pool
+
+    @asynccontextmanager
+    async def request(self, region: str, method: str, url: str, total_timeout: Optional[float] = None, **kwargs):
+        """Send a request on the region's pool and yield the response"""
+        pool = self._pool(region)
+        pool.in_flight += 1
+        pool.requests += 1
+        pool.peak_in_flight = max(pool.peak_in_flight, pool.in_flight)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            async with pool.session.request(
+                method,
+                url,
+                timeout=self.timeout(total_timeout),
+                **kwargs
+            ) as response:
+                status = str(response.status)
+                yield response
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise
+        finally:
+            pool.in_flight -= 1
+            UPSTREAM_LATENCY.labels(region, endpoint_template(url), status).observe(time.perf_counter() - started)
+
+    def stats(self):
+        """Utilization of each region's pool"""
+        return {
+            region: {
+                "in_flight": pool.in_flight,
+                "peak_in_flight": pool.peak_in_flight,
+                "requests": pool.requests,
+                "limit": self.pool_size,
+                "limit_per_host": self.pool_size_per_host,
+                "utilization": pool.in_flight / self.pool_size
+            }
+            for region, pool in self._pools.items()
+        }
+
+    async def close(self):
+        for pool in self._pools.values():
+            if not pool.session.closed:
+                await pool.session.close()
+        self._pools.clear()
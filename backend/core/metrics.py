@@ -0,0 +1,102 @@
+import os
+import re
+from urllib.parse import urlsplit
+
+import dotenv
+
+# prometheus_client picks multiprocess mode from the environment when it is
+# imported, so the .env file has to be loaded first
+dotenv.load_dotenv()
+
+try:
+    import prometheus_client
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:
+    prometheus_client = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# With several uvicorn workers each process writes its samples here and
+# /metrics aggregates them; the directory must be emptied before startup
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NoopMetric:
+    """Stands in for a metric when prometheus_client is not installed"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, amount):
+        pass
+
+
+if prometheus_client is not None:
+    CACHE_LOOKUPS = Counter(
+        "bnet_cache_lookups_total",
+        "Cache lookups by tier, cache type and result (hit, miss, stale, expired, error)",
+        ["tier", "cache_type", "result"]
+    )
+    LIMITER_WAIT = Histogram(
+        "bnet_limiter_wait_seconds",
+        "Time spent waiting for a rate limiter slot",
+        ["limiter", "priority"],
+        buckets=(0.001,) + LATENCY_BUCKETS
+    )
+    UPSTREAM_LATENCY = Histogram(
+        "bnet_upstream_request_seconds",
+        "Battle.net request latency by region, endpoint template and status",
+        ["region", "endpoint", "status"],
+        buckets=LATENCY_BUCKETS
+    )
+    UPSTREAM_RETRIES = Counter(
+        "bnet_upstream_retries_total",
+        "Battle.net requests retried, by reason",
+        ["region", "reason"]
+    )
+    UPSTREAM_FAILURES = Counter(
+        "bnet_upstream_failures_total",
+        "Battle.net requests that gave up, by reason",
+        ["region", "reason"]
+    )
+else:
+    CACHE_LOOKUPS = LIMITER_WAIT = UPSTREAM_LATENCY = UPSTREAM_RETRIES = UPSTREAM_FAILURES = _NoopMetric()
+
+
+# Path segments that name a realm, guild, character or id are collapsed so
+# each endpoint is one label value rather than one per guild
+ENDPOINT_TEMPLATES = [
+    (re.compile(r"^/profile/wow/character/[^/]+/[^/]+"), "/profile/wow/character/{realm}/{character}"),
+    (re.compile(r"^/data/wow/guild/[^/]+/[^/]+"), "/data/wow/guild/{realm}/{guild}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{id}"),
+]
+
+
+def endpoint_template(url: str) -> str:
+    path = urlsplit(url).path
+    for pattern, template in ENDPOINT_TEMPLATES:
+        path = pattern.sub(template, path)
+    return path
+
+
+def render_metrics() -> bytes:
+    """Metrics in the Prometheus text format, aggregated over every worker"""
+    if prometheus_client is None:
+        return b""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
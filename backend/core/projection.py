@@ -0,0 +1,81 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# A spec lists the fields to keep. Values are True to keep a field whole, a
+# nested spec, or a tuple of field names as shorthand for keeping each of
+# them whole. Specs apply to every element of a list.
+
+
+def project(data: Any, spec) -> Any:
+    """Copy of ``data`` holding only the fields named in ``spec``"""
+    if spec is True or data is None:
+        return data
+    if isinstance(data, list):
+        return [project(item, spec) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if isinstance(spec, tuple):
+        return {field: data[field] for field in spec if field in data}
+    return {
+        field: project(data[field], field_spec)
+        for field, field_spec in spec.items()
+        if field in data
+    }
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Endpoint pattern and the fields of its response worth caching"""
+    pattern: str
+    spec: dict
+
+    @property
+    def fingerprint(self) -> str:
+        """Changes with the spec, so entries cached under an older spec are not reused"""
+        encoded = json.dumps(self.spec, sort_keys=True, default=list)
+        return hashlib.sha256(encoded.encode()).hexdigest()[:8]
+
+    def apply(self, data):
+        return project(data, self.spec)
+
+
+_ID_NAME_SLUG = ("id", "name", "slug")
+
+# First matching projection wins. Only fields read by the routes or the
+# frontend are listed; endpoints without a projection, such as equipment
+# which the tooltips read almost entirely, are cached whole.
+PROJECTIONS = [
+    Projection(r"^/data/wow/guild/[^/]+/[^/]+/roster$", {
+        "guild": {"id": True, "name": True, "faction": True, "realm": _ID_NAME_SLUG},
+        "members": {
+            "rank": True,
+            "character": {
+                "id": True,
+                "name": True,
+                "level": True,
+                "realm": _ID_NAME_SLUG,
+                "playable_class": ("id",),
+                "playable_race": ("id",)
+            }
+        }
+    }),
+    Projection(r"^/data/wow/guild/[^/]+/[^/]+$", {
+        "id": True, "name": True, "faction": True, "realm": _ID_NAME_SLUG
+    }),
+    Projection(r"^/data/wow/realm/index$", {"realms": _ID_NAME_SLUG}),
+    Projection(r"^/data/wow/playable-race/index$", {"races": ("id", "name")}),
+    Projection(r"^/data/wow/playable-class/index$", {"classes": ("id", "name")}),
+    # Class, spec and item media, including item media fetched by absolute URL
+    Projection(r"/data/wow/media/", {"id": True, "assets": True}),
+]
+
+
+def resolve_projection(endpoint: str) -> Optional[Projection]:
+    """Projection for an endpoint, or None to cache the response whole"""
+    for projection in PROJECTIONS:
+        if re.search(projection.pattern, endpoint):
+            return projection
+    return None
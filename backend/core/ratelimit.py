@@ -0,0 +1,198 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import List, Tuple
+
+import redis
+from aiolimiter import AsyncLimiter
+
+from .cache import redis_client
+from .log import log
+from .metrics import LIMITER_WAIT
+
+# Refills every bucket in KEYS from Redis server time and puts back the
+# ARGV[3] unused tokens of an expired lease, then grants up to ARGV[1] tokens
+# from all of them at once without dipping below the reserved fraction
+# ARGV[2] of any bucket. ARGV[4..] holds a (tokens per millisecond, capacity)
+# pair per key.
+# Returns {granted, milliseconds until the next token}.
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local granted = tonumber(ARGV[1])
+local reserve = tonumber(ARGV[2])
+local returned = tonumber(ARGV[3])
+local wait = 0
+local levels = {}
+
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 + 2])
+    local capacity = tonumber(ARGV[i * 2 + 3])
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate + returned)
+    levels[i] = tokens
+
+    local floor = reserve * capacity
+    local available = math.max(0, math.floor(tokens - floor))
+    if available < granted then
+        granted = available
+    end
+    if available < 1 then
+        wait = math.max(wait, math.ceil((1 + floor - tokens) / rate))
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 + 2])
+    local capacity = tonumber(ARGV[i * 2 + 3])
+    redis.call('HSET', key, 'tokens', levels[i] - granted, 'updated', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate) + 1000)
+end
+
+return {granted, wait}
+"""
+
+
+class Priority(Enum):
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+    BACKGROUND = "background"
+
+
+# Fraction of each bucket a lane must leave untouched. Interactive requests
+# may drain the bucket; bulk fan-out keeps a fifth back for them and
+# background work only runs on quota nobody else is using.
+LANE_RESERVE = {
+    Priority.INTERACTIVE: 0.0,
+    Priority.BULK: 0.2,
+    Priority.BACKGROUND: 0.5
+}
+
+
+class _Lane:
+    """Tokens leased for one priority lane in this process"""
+
+    def __init__(self):
+        self.tokens = 0
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+        self.acquired = 0
+
+    def take(self) -> bool:
+        if self.has_tokens():
+            self.tokens -= 1
+            self.acquired += 1
+            return True
+        return False
+
+    def has_tokens(self) -> bool:
+        return self.tokens > 0 and time.monotonic() < self.expires_at
+
+
+class DistributedRateLimiter:
+    """
+    Token-bucket rate limiter shared through Redis by every process.
+
+    Each process leases a small batch of tokens per round trip and hands them
+    out locally, so most acquisitions never touch Redis. Leases expire quickly
+    to keep a worker from hoarding tokens it is not using, and the unused
+    part of an expired lease is returned with the next one. Requests are split
+    into priority lanes that lease separately and may only take tokens above
+    their lane's reserve, so bulk work cannot starve interactive pages. If
+    Redis is unavailable it falls back to per-process limiters with the same
+    limits.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limits: List[Tuple[int, float]],
+        lease_size: int = 10,
+        lease_ttl: float = 1.0
+    ):
+        self.name = name
+        self.limits = limits
+        self.lease_size = lease_size
+        self.lease_ttl = lease_ttl
+
+        self._keys = [f"ratelimit:{name}:{int(period)}" for _, period in limits]
+        self._args = []
+        for max_rate, period in limits:
+            self._args += [max_rate / (period * 1000), max_rate]
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+        self._lanes = {priority: _Lane() for priority in Priority}
+        self._degraded = False
+        self._fallback = [AsyncLimiter(max_rate, period) for max_rate, period in limits]
+
+    async def _lease(self, priority: Priority, returned: int = 0) -> Tuple[int, int]:
+        granted, wait_ms = await self._script(
+            keys=self._keys,
+            args=[self.lease_size, LANE_RESERVE[priority], returned, *self._args]
+        )
+        return int(granted), int(wait_ms)
+
+    async def _acquire_fallback(self):
+        for limiter in self._fallback:
+            await limiter.acquire()
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        lane = self._lanes[priority]
+        lane.waiting += 1
+        started = time.perf_counter()
+        try:
+            while not lane.take():
+                # Only one caller per lane refills; the rest queue on the lock
+                async with lane.lock:
+                    if lane.has_tokens():
+                        continue
+                    # Whatever is left of an expired lease goes back to the
+                    # buckets, so a quiet lane only spends what it sends
+                    returned, lane.tokens = lane.tokens, 0
+                    try:
+                        granted, wait_ms = await self._lease(priority, returned)
+                    except redis.RedisError as e:
+                        if not self._degraded:
+                            log.warning(f"Rate limiter {self.name} falling back to local limits: {str(e)}")
+                            self._degraded = True
+                        await self._acquire_fallback()
+                        lane.acquired += 1
+                        return
+                    self._degraded = False
+
+                    if granted:
+                        lane.tokens = granted
+                        lane.expires_at = time.monotonic() + self.lease_ttl
+                    else:
+                        await asyncio.sleep(max(wait_ms, 1) / 1000)
+        finally:
+            lane.waiting -= 1
+            LIMITER_WAIT.labels(self.name, priority.value).observe(time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def limit(self, priority: Priority = Priority.INTERACTIVE):
+        await self.acquire(priority)
+        yield self
+
+    def stats(self):
+        """Queue depth and throughput for each lane in this process"""
+        return {
+            priority.value: {
+                "waiting": lane.waiting,
+                "acquired": lane.acquired,
+                "leased_tokens": lane.tokens if lane.has_tokens() else 0,
+                "reserve": LANE_RESERVE[priority]
+            }
+            for priority, lane in self._lanes.items()
+        }
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
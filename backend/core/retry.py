@@ -0,0 +1,126 @@
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+class BlizzardAPIError(Exception):
+    """Battle.net could not produce an answer, as opposed to answering 'not found'"""
+    status_code = 502
+
+
+class UpstreamTimeout(BlizzardAPIError):
+    """The request deadline passed before Battle.net answered"""
+    status_code = 504
+
+
+class UpstreamUnavailable(BlizzardAPIError):
+    """Battle.net kept failing or throttling until retries ran out"""
+    status_code = 503
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """Requests to the region are short-circuited after repeated failures"""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Deadline and capped exponential backoff with full jitter"""
+    deadline: float = 10.0
+    max_attempts: int = 4
+    base_delay: float = 0.25
+    max_delay: float = 5.0
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before retry number ``attempt``. A Retry-After from Battle.net is
+        used in full; ``max_delay`` only caps the exponential backoff
+        """
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent traffic.
+
+    Every request deposits ``ratio`` tokens and every retry spends one, so
+    during a brownout retries cannot multiply load on Battle.net.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 10, max_tokens: float = 100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+
+    def record_request(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures and lets a single trial request through
+    once ``reset_timeout`` has passed. A trial that reports no outcome within
+    another ``reset_timeout`` is given up on and the next request tried.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at: Optional[float] = None
+
+    def check(self):
+        """Raise CircuitOpenError unless a request may go upstream now"""
+        if self.state == self.CLOSED:
+            return
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.trial_started_at = now
+            return
+        if self.state == self.HALF_OPEN and (
+            self.trial_started_at is None or now - self.trial_started_at >= self.reset_timeout
+        ):
+            self.trial_started_at = now
+            return
+        raise CircuitOpenError(f"Circuit for {self.name} is {self.state}")
+
+    def release(self):
+        """The admitted request ended without saying anything about the region"""
+        if self.state == self.HALF_OPEN:
+            self.trial_started_at = None
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trial_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.trial_started_at = None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in seconds; HTTP-date values are ignored in favour of backoff"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
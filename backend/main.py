@@ -1,10 +1,16 @@
+import asyncio
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from models import create_db_and_tables
+from database import create_db_and_tables, engine
 from core.bliz import BlizzardAPIClient
+from core.catalogue import CatalogueStore
+from core.cache import close_redis, purge_legacy_keys
+from core.log import log
+from core.retry import BlizzardAPIError
 from core.simc import SimcClient
 from core.websocket import WebSocketManager
 from routes import (
@@ -15,23 +21,45 @@ from routes import (
     roster, 
     item,
     simc,
+    cache,
+    upstream,
+    metrics,
 )
 
+async def purge_legacy_cache_keys():
+    try:
+        purged = await purge_legacy_keys()
+        if purged:
+            log.info(f"Removed {purged} legacy cache entries")
+    except Exception as e:
+        log.warning(f"Could not remove legacy cache entries: {str(e)}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI lifespan events for startup and shutdown."""
     # Startup: Create database tables and initialize clients
-    create_db_and_tables()
+    await create_db_and_tables()
     
     # Create singleton instances that will be shared across all requests
     app.state.blizzard_client = BlizzardAPIClient()
     app.state.simc_client = SimcClient()
     app.state.websocket_manager = WebSocketManager()
     
+    # Game data shared by every route, kept fresh in the background
+    app.state.catalogue = CatalogueStore(app.state.blizzard_client)
+    await app.state.catalogue.start()
+    
+    # One-off removal of cache entries under the old key format
+    legacy_purge = asyncio.create_task(purge_legacy_cache_keys())
+    
     yield  # Application is running
     
     # Shutdown: Clean up resources
+    legacy_purge.cancel()
+    await app.state.catalogue.stop()
     await app.state.blizzard_client.close()
+    await close_redis()
+    await engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -44,6 +72,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(BlizzardAPIError)
+async def blizzard_api_error_handler(request: Request, exc: BlizzardAPIError):
+    """Report upstream timeouts and outages distinctly from missing resources"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc), "error_code": type(exc).__name__}
+    )
+
 # Include routers
 app.include_router(account.router, prefix="/api")
 app.include_router(user.router, prefix="/api")
@@ -51,4 +87,8 @@ app.include_router(character.router, prefix="/api")
 app.include_router(guild.router, prefix="/api")
 app.include_router(roster.router, prefix="/api")
 app.include_router(item.router, prefix="/api")
-app.include_router(simc.router, prefix="/api")
\ No newline at end of file
+app.include_router(simc.router, prefix="/api")
+app.include_router(cache.router, prefix="/api")
+app.include_router(upstream.router, prefix="/api")
+# Scraped by Prometheus, so served at the conventional path
+app.include_router(metrics.router)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from typing import Optional, List
-from sqlmodel import Field, SQLModel, Relationship, create_engine
+from sqlmodel import Field, SQLModel, Relationship
 from datetime import datetime
 from enum import Enum
 from sqlalchemy import UniqueConstraint
@@ -62,6 +62,9 @@ class Gender(str, Enum):
 
 class Character(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Battle.net ids are only unique within a region
+    bnet_id: int
+    region: str = Field(max_length=2)
     name: str
     realm: str
     level: Optional[int] = Field(default=None)
@@ -86,11 +89,14 @@ class Character(SQLModel, table=True):
     )
     character_rosters: List[RosterCharacter] = Relationship(back_populates="character")
     __table_args__ = (
-        UniqueConstraint('name', 'realm', name='uix_character_name_realm'),
+        UniqueConstraint('region', 'bnet_id', name='uix_character_region_bnet_id'),
+        UniqueConstraint('region', 'name', 'realm', name='uix_character_region_name_realm'),
     )
 
 class Guild(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    bnet_id: int
+    region: str = Field(max_length=2)
     name: str
     realm: str
     faction: Faction
@@ -109,12 +115,6 @@ class Guild(SQLModel, table=True):
     )
     rosters: List[Roster] = Relationship(back_populates="guild")
     __table_args__ = (
-        UniqueConstraint('name', 'realm', name='uix_guild_name_realm'),
+        UniqueConstraint('region', 'bnet_id', name='uix_guild_region_bnet_id'),
+        UniqueConstraint('region', 'name', 'realm', name='uix_guild_region_name_realm'),
     )
-
-# Database configuration
-DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(DATABASE_URL)
-
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
@@ -1,10 +1,9 @@
-import aiohttp
 from fastapi import APIRouter, Request, Response, Depends
 from fastapi.responses import JSONResponse
 
 from auth import create_access_token
 from database import get_or_create_user
-from core.bliz import get_blizzard_client, BlizzardAPIClient
+from core.bliz import get_blizzard_client, get_region_locale, BlizzardAPIClient, RegionLocale
 from core.log import log
 
 router = APIRouter(tags=["auth"])
@@ -12,17 +11,11 @@ router = APIRouter(tags=["auth"])
 @router.get("/login-url")
 async def get_login_url(
     response: Response,
-    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client),
+    region_locale: RegionLocale = Depends(get_region_locale)
 ):
     state = bliz.get_state()
-    AUTH_URL = (
-        f"https://us.battle.net/oauth/authorize?"
-        f"response_type=code"
-        f"&state={state}"
-        f"&client_id={bliz.CLIENT_ID}"
-        f"&redirect_uri={bliz.REDIRECT_URI}"
-        f"&scope=openid%20profile%20email%20battlenet-profile-read%20battlenet-account-read%20wow.profile"
-    )
+    AUTH_URL = bliz.get_authorize_url(state, region_locale.region)
     
     response.set_cookie(
         key="oauth_state",
@@ -32,6 +25,15 @@ async def get_login_url(
         samesite="lax",
         max_age=300
     )
+    # The code must be exchanged with the same region that issued it
+    response.set_cookie(
+        key="oauth_region",
+        value=region_locale.region.name.lower(),
+        httponly=True,
+        secure=False, # SET TO True FOR PRODUCTION
+        samesite="lax",
+        max_age=300
+    )
     
     return {"auth_url": AUTH_URL}
 
@@ -57,17 +59,15 @@ async def oauth_callback(
         )
     
     response.delete_cookie("oauth_state")
+    response.delete_cookie("oauth_region")
     
     try:
-        token_data = await bliz.get_access_token(code)
+        region = RegionLocale.from_params(request.cookies.get("oauth_region", "us")).region
+        token_data = await bliz.get_access_token(code, region)
         
-        async with aiohttp.ClientSession() as session:
-            user_info_url = "https://us.battle.net/oauth/userinfo"
-            headers = {"Authorization": f"Bearer {token_data['access_token']}"}
-            async with session.get(user_info_url, headers=headers) as bnet_response:
-                user_info = await bnet_response.json()
+        user_info = await bliz.get_user_info(token_data['access_token'], region)
         
-        user = get_or_create_user(user_info, token_data['access_token'], token_data['expires_in'])
+        user = await get_or_create_user(user_info, token_data['access_token'], token_data['expires_in'])
         
         access_token = create_access_token(data={"sub": str(user.id)})
         
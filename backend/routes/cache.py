@@ -0,0 +1,166 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from slugify import slugify
+from sqlalchemy.orm import joinedload
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from auth import get_current_user, is_admin
+from database import get_db
+from models import User, Guild, Character
+from .roster import user_is_officer
+from core.bliz import get_blizzard_client, get_region_locale, BlizzardAPIClient, RegionLocale
+from core.cache import (
+    resolve_cache_policy,
+    parse_cache_key,
+    get_cache_stats,
+    guild_tag,
+    character_tag,
+    realm_tag,
+    tag_members,
+    invalidate_tag,
+)
+from core.projection import resolve_projection
+
+router = APIRouter(tags=["cache"])
+
+@router.get("/cache/policy")
+async def get_cache_policy(
+    key: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    namespace: Optional[str] = None,
+    region: Optional[str] = None,
+    current_user: User | None = Depends(get_current_user)
+):
+    if not current_user:
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+
+    if key:
+        parts = parse_cache_key(key)
+        if not parts:
+            return JSONResponse(status_code=400, content={"detail": "Not a Battle.net cache key"})
+        endpoint, namespace, region = parts["endpoint"], parts["namespace"], parts["region"]
+
+    if not endpoint:
+        return JSONResponse(status_code=400, content={"detail": "Either key or endpoint is required"})
+
+    policy = resolve_cache_policy(endpoint, namespace=namespace, region=region)
+    projection = resolve_projection(endpoint)
+    return {
+        "key": key,
+        "endpoint": endpoint,
+        "namespace": namespace,
+        "region": region,
+        "policy": policy.to_dict(),
+        "projection": {
+            "fields": projection.fingerprint,
+            "spec": projection.spec
+        } if projection else None
+    }
+
+@router.get("/cache/stats")
+async def get_stats(current_user: User | None = Depends(get_current_user)):
+    if not current_user:
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    return await get_cache_stats()
+
+async def invalidate_or_refresh(tag: str, refresh: bool, current_user: User, bliz: BlizzardAPIClient):
+    if not refresh:
+        return {"tag": tag, "invalidated": await invalidate_tag(tag)}
+
+    # Entries are overwritten in place, so readers never see a gap; ones that
+    # could not be refetched keep their previous value
+    results = await bliz.refresh_cached(await tag_members(tag), current_user.api_token)
+    return {
+        "tag": tag,
+        "refreshed": sum(results.values()),
+        "failed": [cache_key for cache_key, refreshed in results.items() if not refreshed]
+    }
+
+@router.post("/cache/guild/{realm}/{guild}/invalidate")
+async def invalidate_guild(
+    realm: str,
+    guild: str,
+    refresh: bool = False,
+    current_user: User | None = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client),
+    region_locale: RegionLocale = Depends(get_region_locale)
+):
+    if not current_user:
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+
+    guild = slugify(guild)
+    guild_db = next(
+        (
+            g for g in (await db.exec(
+                select(Guild).where(Guild.region == region_locale.region.name.lower(), Guild.realm == realm)
+            )).all()
+            if slugify(g.name) == guild
+        ),
+        None
+    )
+    if not is_admin(current_user) and not await user_is_officer(current_user, guild_db, db):
+        return JSONResponse(
+            status_code=403,
+            content={
+                "detail": "Only guild officers can refresh guild data",
+                "error_code": "INSUFFICIENT_GUILD_RANK"
+            }
+        )
+
+    tag = guild_tag(region_locale.region.name, realm, guild)
+    return await invalidate_or_refresh(tag, refresh, current_user, bliz)
+
+@router.post("/cache/character/{realm}/{character}/invalidate")
+async def invalidate_character(
+    realm: str,
+    character: str,
+    refresh: bool = False,
+    current_user: User | None = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client),
+    region_locale: RegionLocale = Depends(get_region_locale)
+):
+    if not current_user:
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+
+    character_db = (await db.exec(
+        select(Character)
+        .options(joinedload(Character.guild))
+        .where(
+            Character.region == region_locale.region.name.lower(),
+            Character.realm == realm,
+            func.lower(Character.name) == character.lower()
+        )
+    )).first()
+    allowed = is_admin(current_user) or (character_db is not None and (
+        character_db.user_id == current_user.id
+        or await user_is_officer(current_user, character_db.guild, db)
+    ))
+    if not allowed:
+        return JSONResponse(
+            status_code=403,
+            content={"detail": "Only the character's owner or guild officers can refresh it"}
+        )
+
+    tag = character_tag(region_locale.region.name, realm, character)
+    return await invalidate_or_refresh(tag, refresh, current_user, bliz)
+
+@router.post("/cache/realm/{realm}/invalidate")
+async def invalidate_realm(
+    realm: str,
+    refresh: bool = False,
+    current_user: User | None = Depends(get_current_user),
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client),
+    region_locale: RegionLocale = Depends(get_region_locale)
+):
+    if not current_user:
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    if not is_admin(current_user):
+        return JSONResponse(status_code=403, content={"detail": "Admin access required"})
+
+    tag = realm_tag(region_locale.region.name, realm)
+    return await invalidate_or_refresh(tag, refresh, current_user, bliz)
@@ -3,12 +3,12 @@ import logging as log
 
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from auth import get_current_user
-from database import get_db
-from models import User, Character
-from core.bliz import get_blizzard_client, BlizzardAPIClient
+from database import get_db, upsert_characters, ACCOUNT_CHARACTER_FIELDS
+from models import User
+from core.bliz import get_blizzard_client, get_region_locale, BlizzardAPIClient, RegionLocale
 
 router = APIRouter(tags=["character"])
 
@@ -17,8 +17,9 @@ async def get_character_data(
     realm: str,
     character: str,
     current_user: User | None = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+    db: AsyncSession = Depends(get_db),
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client),
+    region_locale: RegionLocale = Depends(get_region_locale)
 ):
     if not current_user:
         return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
@@ -26,49 +27,35 @@ async def get_character_data(
     access_token = current_user.api_token
     
     profile, equipment, character_media, mythic_keystone_profile, raid_progression = await asyncio.gather(
-        bliz.get_character_profile(access_token, realm, character),
-        bliz.get_character_equipment(access_token, realm, character),
-        bliz.get_character_media(access_token, realm, character),
-        bliz.get_mythic_keystone_profile(access_token, realm, character),
-        bliz.get_raid_progression(access_token, realm, character)
+        bliz.get_character_profile(access_token, realm, character, region_locale=region_locale),
+        bliz.get_character_equipment(access_token, realm, character, region_locale=region_locale),
+        bliz.get_character_media(access_token, realm, character, region_locale=region_locale),
+        bliz.get_mythic_keystone_profile(access_token, realm, character, region_locale=region_locale),
+        bliz.get_raid_progression(access_token, realm, character, region_locale=region_locale)
     )
     
     if not profile:
         return JSONResponse(status_code=404, content={"detail": "Character not found"})
 
-    char_id = profile.get('id')
-    existing_character = db.exec(
-        select(Character).where(Character.id == char_id)
-    ).first()
-    
-    if existing_character:
-        existing_character.name = profile.get('name')
-        existing_character.realm = profile.get('realm', {}).get('slug')
-        existing_character.level = profile.get('level')
-        existing_character.faction = profile.get('faction', {}).get('type')
-        existing_character.gender = profile.get('gender', {}).get('type')
-        existing_character.playable_class = profile.get('character_class', {}).get('id')
-        existing_character.playable_race = profile.get('race', {}).get('id')
-        existing_character.user_id = current_user.id
-        db.add(existing_character)
-    else:
-        new_character = Character(
-            id=char_id,
-            name=profile.get('name'),
-            realm=profile.get('realm', {}).get('slug'),
-            user_id=current_user.id,
-            level=profile.get('level'),
-            faction=profile.get('faction', {}).get('type'),
-            gender=profile.get('gender', {}).get('type'),
-            playable_class=profile.get('character_class', {}).get('id'),
-            playable_race=profile.get('race', {}).get('id')
-        )
-        db.add(new_character)
+    character_row = {
+        "bnet_id": profile.get('id'),
+        "user_id": current_user.id,
+        "name": profile.get('name'),
+        "realm": profile.get('realm', {}).get('slug'),
+        "level": profile.get('level'),
+        "faction": profile.get('faction', {}).get('type'),
+        "gender": profile.get('gender', {}).get('type'),
+        "playable_class": profile.get('character_class', {}).get('id'),
+        "playable_race": profile.get('race', {}).get('id')
+    }
     
     try:
-        db.commit()
+        if await db.run_sync(
+            upsert_characters, region_locale.region.name.lower(), [character_row], ACCOUNT_CHARACTER_FIELDS
+        ):
+            await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         log.error(f"Error updating character: {str(e)}")
 
     current_raid = raid_progression["expansions"][-1]["instances"][-1]
@@ -87,12 +74,13 @@ async def get_character_equipment(
     realm: str,
     character: str,
     current_user: User | None = Depends(get_current_user),
-    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client),
+    region_locale: RegionLocale = Depends(get_region_locale)
 ):
     if not current_user:
         return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
 
-    equipment = await bliz.get_character_equipment(current_user.api_token, realm, character)
+    equipment = await bliz.get_character_equipment(current_user.api_token, realm, character, region_locale=region_locale)
     
     if not equipment:
         return JSONResponse(status_code=404, content={"detail": "Character not found"})
@@ -1,30 +1,52 @@
-import asyncio
+import re
 from typing import List
+from urllib.parse import urlsplit
 
 from fastapi import APIRouter, Depends, Body
 from fastapi.responses import JSONResponse
 
 from auth import get_current_user
 from models import User
-from core.bliz import get_blizzard_client, BlizzardAPIClient
+from core.bliz import get_blizzard_client, get_region_locale, BlizzardAPIClient, RegionLocale
 
 router = APIRouter(tags=["item"])
 
+# Plain path segments only, so dot segments cannot lead out of the media documents
+MEDIA_PATH = re.compile(r"^/data/wow/media(/[\w-]+)+$")
+
+def is_media_url(url: str, region_locale: RegionLocale) -> bool:
+    """Whether ``url`` is a media document on the region's API host"""
+    parts = urlsplit(url)
+    api = urlsplit(region_locale.region_url)
+    return (parts.scheme, parts.netloc) == (api.scheme, api.netloc) and MEDIA_PATH.match(parts.path) is not None
+
 @router.post("/item/media")
 async def get_item_media(
     media_urls: List[str] = Body(...),
     current_user: User | None = Depends(get_current_user),
-    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client),
+    region_locale: RegionLocale = Depends(get_region_locale)
 ):
     if not current_user:
         return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
 
+    # The URLs come from the client and are fetched with the user's token
+    if not all(is_media_url(url, region_locale) for url in media_urls):
+        return JSONResponse(status_code=400, content={"detail": "Only Battle.net media URLs are allowed"})
+
     access_token = current_user.api_token
     
-    coroutines = [bliz.get_item_media(access_token, url) for url in media_urls]
-    results = await asyncio.gather(*coroutines)
-    
-    media_data = {url: result for url, result in zip(media_urls, results) if result}
+    # Bounded batch so a large tooltip request cannot monopolize the limiter
+    media_data = {
+        url: result
+        async for url, result in bliz.fetch_many(
+            media_urls,
+            access_token,
+            region_locale=region_locale,
+            construct_endpoint=False
+        )
+        if result
+    }
     
     if not media_data:
         return JSONResponse(status_code=404, content={"detail": "No media found"})
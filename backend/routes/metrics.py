@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from core.metrics import CONTENT_TYPE_LATEST, render_metrics, prometheus_client
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+async def get_metrics():
+    if prometheus_client is None:
+        return Response("prometheus_client is not installed\n", status_code=503, media_type="text/plain")
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -1,13 +1,15 @@
-import asyncio
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from sqlmodel import Session, select, and_
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import select, and_
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from core.log import log
-from core.bliz import get_blizzard_client, BlizzardAPIClient
+from core.bliz import get_region_locale, RegionLocale
+from core.catalogue import get_catalogue_store, CatalogueStore, GameDataCatalogue
 from auth import get_current_user
 from database import get_db
 from models import (
@@ -27,50 +29,59 @@ class RosterUpdateRequest(BaseModel):
     size: Optional[int]
     characters: Optional[List[CharacterRosterInfo]]
 
-def user_is_officer(user: User, guild: Guild, db: Session) -> bool:
+async def user_is_officer(user: User, guild: Guild, db: AsyncSession) -> bool:
     if not user or not guild:
         return False
     
-    guild_characters = db.exec(
+    guild_characters = (await db.exec(
         select(Character).where(
             and_(
                 Character.user_id == user.id,
                 Character.guild_id == guild.id
             )
         )
-    ).all()
+    )).all()
     
     return any(char.guild_rank is not None and char.guild_rank <= guild.roster_creation_rank 
                for char in guild_characters)
 
-def get_roster_with_checks(
+def select_rosters():
+    """
+    Roster query that eager loads everything prepare_roster_response reads:
+    the guild in the same statement and all roster characters with their
+    characters in one more, however many rosters are returned.
+    """
+    return select(Roster).options(
+        joinedload(Roster.guild),
+        selectinload(Roster.roster_characters).joinedload(RosterCharacter.character)
+    )
+
+async def get_roster_with_checks(
     realm: str,
     guild: str,
     roster_id: int,
     current_user: User,
-    db: Session
+    db: AsyncSession,
+    region: str
 ) -> Optional[Roster]:
-    roster = db.exec(
-        select(Roster)
+    roster = (await db.exec(
+        select_rosters()
         .where(Roster.id == roster_id)
         .join(Guild)
-        .where(Guild.name == guild, Guild.realm == realm)
-    ).first()
+        .where(Guild.region == region, Guild.name == guild, Guild.realm == realm)
+    )).first()
 
     if not roster:
         return None
 
-    if not user_is_officer(current_user, roster.guild, db):
+    if not await user_is_officer(current_user, roster.guild, db):
         return None
 
     return roster
 
 async def prepare_roster_character(
     character: Character, 
-    class_dict: dict, 
-    class_media_dict: dict, 
-    race_dict: dict,
-    realm_dict: dict, 
+    catalogue: GameDataCatalogue, 
     role: CharacterRole | None = None, 
     status: RosterStatus | None = None
 ) -> dict:
@@ -84,12 +95,12 @@ async def prepare_roster_character(
         },
         "playable_class": {
             "id": character.playable_class,
-            "name": class_dict[character.playable_class],
-            "media": class_media_dict[character.playable_class]
+            "name": catalogue.class_name(character.playable_class),
+            "media": catalogue.class_media_for(character.playable_class)
         },
         "playable_race": {
             "id": character.playable_race,
-            "name": race_dict[character.playable_race]
+            "name": catalogue.race_name(character.playable_race)
         },
         "level": character.level,
         "role": role,
@@ -99,10 +110,7 @@ async def prepare_roster_character(
 
 async def prepare_roster_response(
     roster: Roster, 
-    class_dict: dict, 
-    class_media_dict: dict, 
-    race_dict: dict,
-    realm_dict: dict
+    catalogue: GameDataCatalogue
 ) -> dict:
     return {
         "id": roster.id,
@@ -117,10 +125,7 @@ async def prepare_roster_response(
             {
                 **(await prepare_roster_character(
                     rc.character, 
-                    class_dict, 
-                    class_media_dict, 
-                    race_dict,
-                    realm_dict, 
+                    catalogue, 
                     rc.role, 
                     rc.status
                 )),
@@ -134,16 +139,17 @@ async def get_guild_roster(
     realm: str,
     guild: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+    db: AsyncSession = Depends(get_db),
+    region_locale: RegionLocale = Depends(get_region_locale),
+    catalogues: CatalogueStore = Depends(get_catalogue_store)
 ):
     if not current_user:
         return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
     
-    guild_db = db.exec(
+    guild_db = (await db.exec(
         select(Guild)
-        .where(Guild.name == guild, Guild.realm == realm)
-    ).first()
+        .where(Guild.region == region_locale.region.name.lower(), Guild.name == guild, Guild.realm == realm)
+    )).first()
 
     if not guild_db:
         return JSONResponse(
@@ -151,7 +157,7 @@ async def get_guild_roster(
             content={"detail": "Guild not found"}
         )
 
-    if not user_is_officer(current_user, guild_db, db):
+    if not await user_is_officer(current_user, guild_db, db):
         return JSONResponse(
             status_code=403,
             content={
@@ -160,29 +166,15 @@ async def get_guild_roster(
             }
         )
 
-    access_token = current_user.api_token
-    
-    # Fetch necessary data from Blizzard API
-    race_index, class_index = await asyncio.gather(
-        bliz.get_playable_race_index(access_token),
-        bliz.get_playable_class_index(access_token)
-    )
-
-    race_dict = dict([(race["id"], race["name"]) for race in race_index["races"]])
-    class_dict = dict([(playable_class["id"], playable_class["name"]) 
-                       for playable_class in class_index["classes"]])
-
-    # Fetch class media
-    class_media_tasks = [bliz.get_class_media(access_token, class_id) 
-                         for class_id in class_dict.keys()]
-    class_media_results = await asyncio.gather(*class_media_tasks)
-    class_media_dict = dict(zip(class_dict.keys(), class_media_results))
+    catalogue = await catalogues.get(region_locale, current_user.api_token)
+    if not catalogue:
+        return JSONResponse(status_code=503, content={"detail": "Game data unavailable"})
 
-    characters = db.exec(
+    characters = (await db.exec(
         select(Character)
         .where(Character.guild_id == guild_db.id)
         .order_by(Character.name)
-    ).all()
+    )).all()
 
     prepared_characters = []
     for character in characters:
@@ -196,12 +188,12 @@ async def get_guild_roster(
             },
             "playable_class": {
                 "id": character.playable_class,
-                "name": class_dict[character.playable_class],
-                "media": class_media_dict[character.playable_class]
+                "name": catalogue.class_name(character.playable_class),
+                "media": catalogue.class_media_for(character.playable_class)
             },
             "playable_race": {
                 "id": character.playable_race,
-                "name": race_dict[character.playable_race]
+                "name": catalogue.race_name(character.playable_race)
             },
             "level": character.level,
             "guild_rank": character.guild_rank
@@ -221,16 +213,17 @@ async def get_guild_rosters(
     realm: str,
     guild: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+    db: AsyncSession = Depends(get_db),
+    region_locale: RegionLocale = Depends(get_region_locale),
+    catalogues: CatalogueStore = Depends(get_catalogue_store)
 ):
     if not current_user:
         return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
 
-    guild_db = db.exec(
+    guild_db = (await db.exec(
         select(Guild)
-        .where(Guild.name == guild, Guild.realm == realm)
-    ).first()
+        .where(Guild.region == region_locale.region.name.lower(), Guild.name == guild, Guild.realm == realm)
+    )).first()
 
     if not guild_db:
         return JSONResponse(
@@ -238,7 +231,7 @@ async def get_guild_rosters(
             content={"detail": "Guild not found"}
         )
 
-    if not user_is_officer(current_user, guild_db, db):
+    if not await user_is_officer(current_user, guild_db, db):
         return JSONResponse(
             status_code=403,
             content={
@@ -247,35 +240,17 @@ async def get_guild_rosters(
             }
         )
 
-    access_token = current_user.api_token
-
-    # Fetch necessary data from Blizzard API
-    class_index, realm_index = await asyncio.gather(
-        bliz.get_playable_class_index(access_token),
-        bliz.get_realm_index(access_token)
-    )
-
-    class_dict = dict([(playable_class["id"], playable_class["name"]) 
-                       for playable_class in class_index["classes"]])
-    race_index = await bliz.get_playable_race_index(access_token)
-    race_dict = dict([(race["id"], race["name"]) for race in race_index["races"]])
-    
-    realm_dict = dict([(realm["id"], realm["name"]) 
-                       for realm in realm_index["realms"]])
-
-    # Fetch class media
-    class_media_tasks = [bliz.get_class_media(access_token, class_id) 
-                         for class_id in class_dict.keys()]
-    class_media_results = await asyncio.gather(*class_media_tasks)
-    class_media_dict = dict(zip(class_dict.keys(), class_media_results))
+    catalogue = await catalogues.get(region_locale, current_user.api_token)
+    if not catalogue:
+        return JSONResponse(status_code=503, content={"detail": "Game data unavailable"})
 
-    rosters = db.exec(
-        select(Roster)
+    rosters = (await db.exec(
+        select_rosters()
         .where(Roster.guild_id == guild_db.id)
         .order_by(Roster.updated_at.desc())
-    ).all()
+    )).all()
 
-    return [await prepare_roster_response(roster, class_dict, class_media_dict, race_dict, realm_dict) 
+    return [await prepare_roster_response(roster, catalogue) 
             for roster in rosters]
 
 @router.get("/guild/{realm}/{guild}/{roster_id}")
@@ -284,39 +259,24 @@ async def get_roster(
     guild: str,
     roster_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+    db: AsyncSession = Depends(get_db),
+    region_locale: RegionLocale = Depends(get_region_locale),
+    catalogues: CatalogueStore = Depends(get_catalogue_store)
 ):
     if not current_user:
         return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
 
-    access_token = current_user.api_token
-
-    roster = get_roster_with_checks(realm, guild, roster_id, current_user, db)
+    roster = await get_roster_with_checks(
+        realm, guild, roster_id, current_user, db, region_locale.region.name.lower()
+    )
     if not roster:
         return JSONResponse(
             status_code=404,
             content={"detail": "Roster not found or insufficient permissions"}
         )
 
-    access_token = current_user.api_token
-
-    # Fetch necessary data from Blizzard API
-    class_index, realm_index = await asyncio.gather(
-        bliz.get_playable_class_index(access_token),
-        bliz.get_realm_index(access_token)
-    )
-    race_index = await bliz.get_playable_race_index(access_token)
-    race_dict = dict([(race["id"], race["name"]) for race in race_index["races"]])
-    class_dict = dict([(playable_class["id"], playable_class["name"]) 
-                       for playable_class in class_index["classes"]])
-    realm_dict = dict([(realm["id"], realm["name"]) 
-                       for realm in realm_index["realms"]])
-
-    # Fetch class media
-    class_media_tasks = [bliz.get_class_media(access_token, class_id) 
-                         for class_id in class_dict.keys()]
-    class_media_results = await asyncio.gather(*class_media_tasks)
-    class_media_dict = dict(zip(class_dict.keys(), class_media_results))
+    catalogue = await catalogues.get(region_locale, current_user.api_token)
+    if not catalogue:
+        return JSONResponse(status_code=503, content={"detail": "Game data unavailable"})
     
-    return await prepare_roster_response(roster, class_dict, class_media_dict, race_dict, realm_dict)
\ No newline at end of file
+    return await prepare_roster_response(roster, catalogue)
\ No newline at end of file
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from auth import get_current_user
+from models import User
+from core.bliz import get_blizzard_client, BlizzardAPIClient
+
+router = APIRouter(tags=["upstream"])
+
+@router.get("/upstream/limiter")
+async def get_limiter_stats(
+    current_user: User | None = Depends(get_current_user),
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+):
+    if not current_user:
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    return {
+        region.name.lower(): limiter.stats()
+        for region, limiter in bliz.rate_limiters.items()
+    }
+
+@router.get("/upstream/pools")
+async def get_pool_stats(
+    current_user: User | None = Depends(get_current_user),
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+):
+    if not current_user:
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    return bliz.http.stats()
@@ -1,13 +1,12 @@
-from logging import log
-
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from auth import get_current_user
-from database import get_db
-from models import User, Character
-from core.bliz import get_blizzard_client, BlizzardAPIClient
+from database import get_db, upsert_characters, ACCOUNT_CHARACTER_FIELDS
+from models import User
+from core.bliz import get_blizzard_client, get_region_locale, BlizzardAPIClient, RegionLocale
+from core.log import log
 
 router = APIRouter(tags=["user"])
 
@@ -24,61 +23,40 @@ async def get_account_info(current_user: User | None = Depends(get_current_user)
 @router.get("/wow-profile")
 async def get_wow_profile_data(
     current_user: User | None = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    bliz: BlizzardAPIClient = Depends(get_blizzard_client)
+    db: AsyncSession = Depends(get_db),
+    bliz: BlizzardAPIClient = Depends(get_blizzard_client),
+    region_locale: RegionLocale = Depends(get_region_locale)
 ):
     if not current_user:
         return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
     
     access_token = current_user.api_token
-    wow_profile = await bliz.get_wow_profile(access_token)
+    wow_profile = await bliz.get_wow_profile(access_token, region_locale=region_locale)
     
-    characters = []
-    for account in wow_profile.get('wow_accounts', []):
-        for char_data in account.get('characters', []):
-            char_id = char_data.get('id')
-            name = char_data.get('name')
-            realm_name = char_data.get('realm', {}).get('slug')
-            level = char_data.get('level')
-            faction = char_data.get('faction', {}).get('type')
-            gender = char_data.get('gender', {}).get('type')
-            playable_class = char_data.get('playable_class', {}).get('id')
-            playable_race = char_data.get('playable_race', {}).get('id')
-            
-            existing_character = db.exec(
-                select(Character).where(Character.id == char_id)
-            ).first()
-            
-            if existing_character:
-                existing_character.user_id = current_user.id
-                existing_character.name = name
-                existing_character.realm = realm_name
-                existing_character.level = level
-                existing_character.faction = faction
-                existing_character.gender = gender
-                existing_character.playable_class = playable_class
-                existing_character.playable_race = playable_race
-                db.add(existing_character)
-                characters.append(existing_character)
-            else:
-                new_character = Character(
-                    id=char_id,
-                    name=name,
-                    realm=realm_name,
-                    user_id=current_user.id,
-                    level=level,
-                    faction=faction,
-                    gender=gender,
-                    playable_class=playable_class,
-                    playable_race=playable_race
-                )
-                db.add(new_character)
-                characters.append(new_character)
+    characters = [
+        {
+            "bnet_id": char_data.get('id'),
+            "user_id": current_user.id,
+            "name": char_data.get('name'),
+            "realm": char_data.get('realm', {}).get('slug'),
+            "level": char_data.get('level'),
+            "faction": char_data.get('faction', {}).get('type'),
+            "gender": char_data.get('gender', {}).get('type'),
+            "playable_class": char_data.get('playable_class', {}).get('id'),
+            "playable_race": char_data.get('playable_race', {}).get('id')
+        }
+        for account in wow_profile.get('wow_accounts', [])
+        for char_data in account.get('characters', [])
+    ]
     
     try:
-        db.commit()
+        # Unchanged characters are skipped, so a repeat load writes nothing
+        if await db.run_sync(
+            upsert_characters, region_locale.region.name.lower(), characters, ACCOUNT_CHARACTER_FIELDS
+        ):
+            await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         log.error(f"Error updating characters: {str(e)}")
         return JSONResponse(
             status_code=500,
@@ -0,0 +1,65 @@
+"""
+Statements issued by the roster read path.
+
+The roster routes eager load guilds, roster characters and characters, so
+the number of statements per request must not depend on how many rosters
+or characters there are.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.roster_queries import (
+    GUILD, REALM, StaticCatalogues, count_statements, populate
+)
+from core.bliz import RegionLocale
+from models import User
+from routes import roster as roster_routes
+
+# Guild, officer check, rosters with their guilds, roster characters with
+# their characters
+ROSTERS_STATEMENTS = 4
+# Roster with its guild, officer check, roster characters with their characters
+ROSTER_STATEMENTS = 3
+
+
+async def count_roster_statements(path, rosters, size):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await session.run_sync(populate, rosters, size)
+            user = await session.get(User, 1)
+
+        region_locale = RegionLocale()
+        catalogues = StaticCatalogues(region_locale)
+        rosters_count, rosters_response = await count_statements(
+            engine, lambda session: roster_routes.get_guild_rosters(
+                REALM, GUILD, user, session, region_locale, catalogues
+            )
+        )
+        roster_count, roster_response = await count_statements(
+            engine, lambda session: roster_routes.get_roster(
+                REALM, GUILD, 1, user, session, region_locale, catalogues
+            )
+        )
+    finally:
+        await engine.dispose()
+    return rosters_count, rosters_response, roster_count, roster_response
+
+
+@pytest.mark.parametrize("rosters, size", [(1, 10), (10, 30)])
+def test_roster_reads_issue_a_fixed_number_of_statements(tmp_path, rosters, size):
+    rosters_count, rosters_response, roster_count, roster_response = asyncio.run(
+        count_roster_statements(tmp_path / "rosters.db", rosters, size)
+    )
+
+    assert len(rosters_response) == rosters
+    assert all(len(roster["characters"]) == size for roster in rosters_response)
+    assert len(roster_response["characters"]) == size
+    assert rosters_count == ROSTERS_STATEMENTS
+    assert roster_count == ROSTER_STATEMENTS
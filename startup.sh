@@ -145,6 +145,9 @@ if [ "$MODE" = "dev" ]; then
 else
     # Prod mode - uvicorn with workers
     echo -e "${BLUE}Starting FastAPI backend in production mode...${NC}"
+    # Workers share metrics through this directory; stale files would skew them
+    export PROMETHEUS_MULTIPROC_DIR="$(pwd)/backend/.metrics"
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
     (cd backend && python -u -m uvicorn main:app --host 0.0.0.0 --port 8000 --workers 4 2>&1 | prefix_output "Backend" "0;35") &
     BACKEND_PID=$!
 fi